@@ -8,31 +8,46 @@ from datetime import datetime, timedelta, timezone
 import sys
 import os
 import logging
-import ipaddress
-import pandas as pd
 import importlib # For dynamic strategy loading
-from collections import defaultdict # For grouping /16s
 import time # Import time module
 import json # Import json module
-import psutil # Import psutil for system load average
-# ADD pyarrow import for parquet export, handle potential ImportError
-try:
-    import pyarrow
-except ImportError:
-    pyarrow = None
-
+# pandas, numpy, psutil, pyarrow and the analysis modules are imported in main()
+# after the --clean-rules branch, so rule cleanup starts without loading them
 
 # Import own modules
-# Remove LogParser from import, keep functions
-from parser import get_subnet, is_ip_in_whitelist, load_log_into_dataframe
 # Import UFWManager and COMMENT_PREFIX directly if needed
 import ufw_handler
-from threat_analyzer import ThreatAnalyzer
 
 # Logging configuration
 LOG_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
 LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 
+# --- Report / Format Constants and Helpers ---
+
+SUPERNET_REASON_MAX_IDS = 5 # Contained /24s listed in a /16 block reason before "+N more"
+
+# %-format templates for lines repeated per threat / per IP in block messages and the report
+BLOCK_METRICS_TPL = "Metrics: %d reqs, %d IPs, Score: %.1f, Req/Min(Win): %.1f, Req/Hour(Win): %.1f, TimeSpan: %.0fs"
+REPORT_THREAT_TPL = "\n#%d Subnet: %s - Score: %.2f%s"
+REPORT_METRICS_TPL = "  Metrics: %d reqs, %d IPs, Req/Min(Win): %.1f, Req/Hour(Win): %.1f, TimeSpan: %.0fs"
+REPORT_IP_DETAIL_TPL = "     - IP: %s (%s reqs, AvgRPM: %.2f, MaxRPM: %.0f)"
+
+
+def _safe_get_float(val, default=0.0):
+    """Converts a metric value to float, returning default for None or unconvertible values."""
+    if val is None: return default
+    if isinstance(val, (int, float)): return float(val)
+    try: return float(val) # Attempt conversion if string or other
+    except (ValueError, TypeError): return default
+
+
+def _safe_get_int(val, default=0):
+    """Converts a metric value to int, returning default for None or unconvertible values."""
+    if val is None: return default
+    if isinstance(val, (int, float)): return int(val) # Handles float to int conversion
+    try: return int(float(val)) # Attempt conversion to float first, then int
+    except (ValueError, TypeError): return default
+
 # --- Helper Functions for Strike History ---
 
 STRIKE_HISTORY_MAX_AGE_HOURS = 48
@@ -42,18 +57,18 @@ def load_strike_history(filepath):
     logger = logging.getLogger('botstats.strike_history') # Get logger instance
     history = {}
     if not filepath or not os.path.exists(filepath):
-        logger.info(f"Strike history file not found or not specified ('{filepath}'). Starting fresh.")
+        logger.info("Strike history file not found or not specified ('%s'). Starting fresh.", filepath)
         return history
 
     try:
         with open(filepath, 'r') as f:
             history = json.load(f)
-        logger.info(f"Loaded strike history for {len(history)} targets from {filepath}.")
+        logger.info("Loaded strike history for %s targets from %s.", len(history), filepath)
     except json.JSONDecodeError:
-        logger.warning(f"Could not decode JSON from strike history file: {filepath}. Starting fresh.")
+        logger.warning("Could not decode JSON from strike history file: %s. Starting fresh.", filepath)
         return {}
     except Exception as e:
-        logger.error(f"Error loading strike history file {filepath}: {e}. Starting fresh.")
+        logger.error("Error loading strike history file %s: %s. Starting fresh.", filepath, e)
         return {}
 
     # Clean old timestamps
@@ -75,13 +90,13 @@ def load_strike_history(filepath):
                     else:
                         cleaned_count += 1
                 except (ValueError, TypeError):
-                    logger.warning(f"Invalid timestamp format '{ts_str}' for target '{target_id}' in history. Skipping.")
+                    logger.warning("Invalid timestamp format '%s' for target '%s' in history. Skipping.", ts_str, target_id)
         if valid_timestamps:
             cleaned_history[target_id] = valid_timestamps
 
     if cleaned_count > 0:
-        logger.info(f"Removed {cleaned_count} strike entries older than {STRIKE_HISTORY_MAX_AGE_HOURS} hours.")
-    logger.debug(f"Strike history loaded and cleaned. Kept {kept_count} recent strikes for {len(cleaned_history)} targets.")
+        logger.info("Removed %s strike entries older than %s hours.", cleaned_count, STRIKE_HISTORY_MAX_AGE_HOURS)
+    logger.debug("Strike history loaded and cleaned. Kept %s recent strikes for %s targets.", kept_count, len(cleaned_history))
     return cleaned_history
 
 def save_strike_history(filepath, history):
@@ -96,16 +111,16 @@ def save_strike_history(filepath, history):
             json.dump(history, f, indent=2) # Use indent for readability
         # Atomically replace the old file with the new one
         os.replace(temp_filepath, filepath)
-        logger.info(f"Successfully saved strike history for {len(history)} targets to {filepath}.")
+        logger.info("Successfully saved strike history for %s targets to %s.", len(history), filepath)
         return True
     except Exception as e:
-        logger.error(f"Error saving strike history to {filepath}: {e}")
+        logger.error("Error saving strike history to %s: %s", filepath, e)
         # Clean up temp file if it exists
         if os.path.exists(temp_filepath):
             try:
                 os.remove(temp_filepath)
             except OSError as rm_err:
-                logger.error(f"Could not remove temporary strike file {temp_filepath}: {rm_err}")
+                logger.error("Could not remove temporary strike file %s: %s", temp_filepath, rm_err)
         return False
 
 # --- End Helper Functions ---
@@ -196,6 +211,11 @@ def main():
         '--whitelist', '-w',
         help='File with IPs/subnets to exclude from analysis.'
     )
+    parser.add_argument(
+        '--jobs', '-j', type=int, default=1,
+        help='Number of worker processes used to parse the log file in parallel '
+             '(with --time-window/--start-date, only the part of the file in the window).'
+    )
     # --- Blocking Strategy Args ---
     parser.add_argument(
         '--block', action='store_true',
@@ -306,7 +326,7 @@ def main():
     for handler in logging.root.handlers:
         if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
              if args.silent and log_level < logging.WARNING and log_level != logging.DEBUG:
-                 logger.debug(f"Silent mode: Setting console log level to WARNING (was {logging.getLevelName(log_level)})")
+                 logger.debug("Silent mode: Setting console log level to WARNING (was %s)", logging.getLevelName(log_level))
                  handler.setLevel(logging.WARNING)
              else:
                  # Ensure console handler respects the requested log_level if not silent
@@ -322,12 +342,26 @@ def main():
         logger.info("Cleanup completed. Rules deleted: %d", count)
         return
 
+    # --- Deferred heavy imports (not needed for --clean-rules) ---
+    import ipaddress
+    import numpy as np # Packed uint32 addresses for /16 grouping
+    import pandas as pd
+    import psutil # Import psutil for system load average
+    # ADD pyarrow import for parquet export, handle potential ImportError
+    try:
+        import pyarrow
+    except ImportError:
+        pyarrow = None
+    # Remove LogParser from import, keep functions
+    from parser import get_subnet, is_ip_in_whitelist, load_log_into_dataframe, local_to_utc
+    from threat_analyzer import ThreatAnalyzer
+
     # --- File Validation ---
     if not args.file:
         parser.error("the following arguments are required: --file/-f (unless --clean-rules is used)")
         sys.exit(1)
     if not os.path.exists(args.file):
-        logger.error(f"Error: File not found {args.file}")
+        logger.error("Error: File not found %s", args.file)
         sys.exit(1)
 
     # --- Date Calculation ---
@@ -338,19 +372,15 @@ def main():
     if args.time_window:
         start_date_naive_local = calculate_start_date(args.time_window)
         if start_date_naive_local:
-             start_date_aware_local = start_date_naive_local.astimezone()
-             start_date_utc = start_date_aware_local.astimezone(timezone.utc)
+             start_date_utc = local_to_utc(start_date_naive_local)
              analysis_duration_seconds = (now_utc - start_date_utc).total_seconds()
-             logger.info(f"Using time window: {args.time_window} (from {start_date_utc}, duration: {analysis_duration_seconds:.0f}s)")
+             logger.info("Using time window: %s (from %s, duration: %.0fs)", args.time_window, start_date_utc, analysis_duration_seconds)
     elif args.start_date:
         try:
-            start_date_naive_local = datetime.strptime(args.start_date, '%d/%b/%Y:%H:%M:%S')
             # Assume the start date is in the local timezone of the server logs
-            # Convert it to aware local time, then to UTC
-            start_date_aware_local = start_date_naive_local.astimezone() # Make it timezone-aware using local system tz
-            start_date_utc = start_date_aware_local.astimezone(timezone.utc) # Convert to UTC
+            start_date_utc = local_to_utc(datetime.strptime(args.start_date, '%d/%b/%Y:%H:%M:%S'))
             analysis_duration_seconds = (now_utc - start_date_utc).total_seconds()
-            logger.info(f"Using start date: {start_date_utc} (duration until now: {analysis_duration_seconds:.0f}s)")
+            logger.info("Using start date: %s (duration until now: %.0fs)", start_date_utc, analysis_duration_seconds)
         except ValueError:
             logger.error("Error: Invalid date format. Use dd/mmm/yyyy:HH:MM:SS")
             sys.exit(1)
@@ -364,15 +394,15 @@ def main():
         strategy_module = importlib.import_module(f"strategies.{strategy_name}")
         # Assumes each strategy module has a class named 'Strategy'
         strategy_instance = strategy_module.Strategy()
-        logger.info(f"Using blocking strategy: {strategy_name}")
+        logger.info("Using blocking strategy: %s", strategy_name)
         # Optional: Validate required config keys?
         # required_keys = strategy_instance.get_required_config_keys()
         # Check if args has all required_keys...
     except ImportError:
-        logger.error(f"Could not load strategy module: strategies.{strategy_name}.py")
+        logger.error("Could not load strategy module: strategies.%s.py", strategy_name)
         sys.exit(1)
     except AttributeError:
-        logger.error(f"Strategy module strategies.{strategy_name}.py does not contain a 'Strategy' class.")
+        logger.error("Strategy module strategies.%s.py does not contain a 'Strategy' class.", strategy_name)
         sys.exit(1)
 
 
@@ -382,18 +412,19 @@ def main():
     if args.whitelist:
         analyzer.load_whitelist_from_file(args.whitelist)
 
-    logger.info(f"Starting analysis of {args.file}...")
+    logger.info("Starting analysis of %s...", args.file)
     total_overall_requests = 0 # Initialize
     log_df = None # Initialize log_df
 
     try:
         # --- Load and Parse Log Data using the function ---
-        logger.info(f"Loading and parsing log file: {args.file}")
+        logger.info("Loading and parsing log file: %s", args.file)
         # Call the function directly instead of using a class
         log_df = load_log_into_dataframe(
             log_file=args.file,
             start_date_utc=start_date_utc,
-            whitelist=analyzer.whitelist # Pass the loaded whitelist from analyzer
+            whitelist=analyzer.whitelist, # Pass the loaded whitelist from analyzer
+            jobs=args.jobs
         )
 
         if log_df is None or log_df.empty:
@@ -402,10 +433,10 @@ def main():
 
         # Assign the loaded DataFrame to the analyzer instance
         analyzer.log_df = log_df
-        logger.info(f"Successfully loaded {len(log_df)} log entries into DataFrame for analyzer.")
+        logger.info("Successfully loaded %s log entries into DataFrame for analyzer.", len(log_df))
 
         total_overall_requests = len(log_df)
-        logger.info(f"Total requests in analysis window: {total_overall_requests}")
+        logger.info("Total requests in analysis window: %s", total_overall_requests)
 
         # --- Dump DataFrame if requested ---
         if args.dump_data:
@@ -424,9 +455,9 @@ def main():
                     dump_filepath = os.path.join(script_dir, dump_filename)
 
                     # Log the columns being dumped for verification
-                    logger.info(f"Columns in DataFrame to be dumped: {log_df.columns.tolist()}")
+                    logger.info("Columns in DataFrame to be dumped: %s", log_df.columns.tolist())
 
-                    logger.info(f"Dumping loaded log DataFrame ({len(log_df)} rows) to Parquet file: {dump_filepath}")
+                    logger.info("Dumping loaded log DataFrame (%s rows) to Parquet file: %s", len(log_df), dump_filepath)
                     # Ensure index is saved if it's the timestamp, otherwise save without index
                     save_index = isinstance(log_df.index, pd.DatetimeIndex)
                     if not save_index:
@@ -434,14 +465,14 @@ def main():
 
                     log_df.to_parquet(dump_filepath, index=save_index) # Save index only if it's datetime
 
-                    logger.info(f"Successfully dumped data to {dump_filepath}")
+                    logger.info("Successfully dumped data to %s", dump_filepath)
                 except Exception as dump_err:
-                    logger.error(f"Failed to dump DataFrame to Parquet file: {dump_err}", exc_info=True)
+                    logger.error("Failed to dump DataFrame to Parquet file: %s", dump_err, exc_info=True)
         # --- End Dump DataFrame ---
 
 
     except Exception as e:
-        logger.error(f"Error loading/parsing log file: {e}", exc_info=True)
+        logger.error("Error loading/parsing log file: %s", e, exc_info=True)
         sys.exit(1)
 
     # --- Determine Effective Request Threshold ---
@@ -452,15 +483,16 @@ def main():
         # Apply the absolute minimum threshold, ensuring it's at least 1
         effective_min_requests = max(1, relative_min, args.block_absolute_min_requests)
         # UPDATED log message
-        logger.info(f"Calculated effective_min_requests = {effective_min_requests} "
-                    f"(based on {args.block_relative_threshold_percent}% of {total_overall_requests} -> {relative_min}, "
-                    f"absolute min: {args.block_absolute_min_requests}). Used by most strategies.")
+        logger.info("Calculated effective_min_requests = %s "
+                    "(based on %s%% of %s -> %s, absolute min: %s). Used by most strategies.",
+                    effective_min_requests, args.block_relative_threshold_percent, total_overall_requests,
+                    relative_min, args.block_absolute_min_requests)
     else:
         # If no requests, the threshold remains 1, but analysis likely stops anyway
         # Apply absolute minimum here too, although it's unlikely to matter
         effective_min_requests = max(1, args.block_absolute_min_requests)
-        logger.warning(f"Total requests in analysis window is 0. Effective minimum request threshold set to {effective_min_requests} "
-                       f"(based on absolute min: {args.block_absolute_min_requests}).")
+        logger.warning("Total requests in analysis window is 0. Effective minimum request threshold set to %s "
+                       "(based on absolute min: %s).", effective_min_requests, args.block_absolute_min_requests)
 
     # --- Get System Load Average ---
     system_load_avg = -1.0 # Default if psutil fails or not available
@@ -471,9 +503,9 @@ def main():
         # but raw load average is also common. For now, raw 1-min average.
         load_averages = psutil.getloadavg()
         system_load_avg = load_averages[2] # 0: 1-min, 1: 5-min, 2: 15-min
-        logger.info(f"System load average (15-minutes): {system_load_avg:.2f}")
+        logger.info("System load average (15-minutes): %.2f", system_load_avg)
     except Exception as e:
-        logger.warning(f"Could not retrieve system load average using psutil: {e}. Proceeding without it.")
+        logger.warning("Could not retrieve system load average using psutil: %s. Proceeding without it.", e)
     
     # Always print system load average, format based on silent mode
     if system_load_avg != -1.0:
@@ -516,7 +548,7 @@ def main():
         'system_load_avg': system_load_avg,
         # Maximums like 'max_total_requests' will be calculated and added by ThreatAnalyzer
     }
-    logger.debug(f"Initial shared context parameters for ThreatAnalyzer: {shared_context_params}")
+    logger.debug("Initial shared context parameters for ThreatAnalyzer: %s", shared_context_params)
     # --- End Create Shared Context Parameters ---
 
     # --- Identify Threats ---
@@ -539,6 +571,8 @@ def main():
 
     # --- Get DataFrame for Reporting (after threats are identified) ---
     threats_df = analyzer.get_threats_df() # Returns DF indexed by string representation of subnet ID
+    # Rank only the top N once; reused by the blocking and reporting phases
+    top_positions = analyzer.top_threat_positions(args.top)
 
     # --- Calculate Overall Maximums for FINAL REPORTING (using the final threats_df) ---
     max_metrics_data_for_reporting = {}
@@ -548,13 +582,15 @@ def main():
                 try:
                     max_value = threats_df[metric_key].max()
                     # Store for reporting
-                    max_subnets = threats_df[threats_df[metric_key] == max_value].index.tolist()
+                    # List achievers best score first (only the matching rows are sorted)
+                    achievers_df = threats_df[threats_df[metric_key] == max_value]
+                    max_subnets = achievers_df.index[np.argsort(-achievers_df['strategy_score'].to_numpy(), kind='stable')].tolist()
                     max_metrics_data_for_reporting[metric_key] = {'value': max_value, 'subnets': max_subnets}
                 except Exception as e:
-                    logger.warning(f"Could not calculate max for reporting metric '{metric_key}': {e}")
+                    logger.warning("Could not calculate max for reporting metric '%s': %s", metric_key, e)
                     max_metrics_data_for_reporting[metric_key] = {'value': -1, 'subnets': []}
             else:
-                logger.warning(f"Metric '{metric_key}' not found in threats DataFrame for max reporting calculation.")
+                logger.warning("Metric '%s' not found in threats DataFrame for max reporting calculation.", metric_key)
                 max_metrics_data_for_reporting[metric_key] = {'value': -1, 'subnets': []}
     else:
         logger.info("Threats DataFrame is empty. Cannot calculate overall maximums for reporting.")
@@ -563,16 +599,26 @@ def main():
     # --- End Calculate Overall Maximums for FINAL REPORTING ---
 
     # --- Blocking Logic ---
+    # Bind options read inside the block/report loops to locals once
+    dry_run = args.dry_run
+    silent = args.silent
+    top_n = args.top
+    default_block_duration = args.block_duration
+    escalation_strikes = args.block_escalation_strikes
     blocked_targets_count = 0
-    blocked_subnets_via_supernet = set() # Keep track of /24s blocked via /16
+    covered_u32 = set() # /24 network addresses (as uint32 ints) covered by a blocked /16
     blocked_ips_high_rpm = set() # Keep track of IPs blocked due to high RPM
     strike_history = {} # Initialize strike history dict
 
     if args.block:
-        if not args.silent:
+        if not silent:
             print("-" * 30)
-        logger.info(f"Processing blocks (Dry Run: {args.dry_run})...")
-        ufw_manager_instance = ufw_handler.UFWManager(args.dry_run)
+        logger.info("Processing blocks (Dry Run: %s)...", dry_run)
+        # One block time per run: expiry comments, strike entries and block messages share it
+        block_time_utc = datetime.now(timezone.utc)
+        block_time_str = block_time_utc.astimezone().strftime('%Y-%m-%d %H:%M:%S') # Local time, for silent-mode lines
+        strike_time_iso = block_time_utc.strftime('%Y-%m-%dT%H:%M:%SZ')
+        ufw_manager_instance = ufw_handler.UFWManager(dry_run, block_time_utc=block_time_utc)
 
         # --- Load Strike History ---
         strike_history = load_strike_history(args.strike_file)
@@ -580,44 +626,44 @@ def main():
 
         # 0. Block Individual IPs with High Request Rate (req/hour)
         if args.block_ip_min_req_per_hour > 0 and analyzer.ip_metrics_df is not None and 'req_per_hour' in analyzer.ip_metrics_df.columns:
-            logger.info(f"Checking for individual IPs exceeding {args.block_ip_min_req_per_hour} req/hour...")
+            logger.info("Checking for individual IPs exceeding %s req/hour...", args.block_ip_min_req_per_hour)
             high_rpm_ips_df = analyzer.ip_metrics_df[analyzer.ip_metrics_df['req_per_hour'] >= args.block_ip_min_req_per_hour]
 
             if not high_rpm_ips_df.empty:
-                logger.info(f"Found {len(high_rpm_ips_df)} IPs exceeding the threshold. Processing blocks...")
+                logger.info("Found %s IPs exceeding the threshold. Processing blocks...", len(high_rpm_ips_df))
+                target_type = "High RPM IP"
+                # Use specific duration for these IPs, NO strike escalation here
+                block_duration = args.block_ip_duration
+                high_rpm_blocks = [] # (ip_obj, reason) pairs, blocked below
                 for ip_str, ip_metrics in high_rpm_ips_df.iterrows():
                     try:
                         ip_obj = ipaddress.ip_address(ip_str)
-                        target_to_block_obj = ip_obj
-                        target_type = "High RPM IP"
-                        # Use specific duration for these IPs, NO strike escalation here
-                        block_duration = args.block_ip_duration
                         reason = f"exceeded {args.block_ip_min_req_per_hour} req/hour ({ip_metrics['req_per_hour']:.1f})"
-
-                        logger.info(f"Processing block for {target_type}: {target_to_block_obj}. Reason: {reason}")
-                        success = ufw_manager_instance.block_target(
-                            subnet_or_ip_obj=target_to_block_obj,
-                            block_duration_minutes=block_duration
-                        )
-                        if success:
-                            blocked_targets_count += 1
-                            blocked_ips_high_rpm.add(target_to_block_obj) # Add the ipaddress object
-                            action = "Blocked" if not args.dry_run else "Dry Run - Blocked"
-                            timestamp_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                            # ALWAYS PRINT block actions, format based on silent mode
-                            if args.silent:
-                                print(f"{timestamp_str} {action} {target_type}: {target_to_block_obj} for {block_duration}m. Reason: {reason}.")
-                            else:
-                                print(f" -> {action} {target_type}: {target_to_block_obj} for {block_duration} minutes. Reason: {reason}.")
-                        else:
-                            # Only print failure if not silent
-                            if not args.silent:
-                                action = "Failed to block" if not args.dry_run else "Dry Run - Failed"
-                                print(f" -> {action} {target_type}: {target_to_block_obj}.")
+                        logger.info("Processing block for %s: %s. Reason: %s", target_type, ip_obj, reason)
+                        high_rpm_blocks.append((ip_obj, reason))
                     except ValueError:
-                        logger.warning(f"Could not parse IP address '{ip_str}' for high RPM blocking.")
+                        logger.warning("Could not parse IP address '%s' for high RPM blocking.", ip_str)
                     except Exception as e:
-                        logger.error(f"Error processing high RPM block for IP '{ip_str}': {e}")
+                        logger.error("Error processing high RPM block for IP '%s': %s", ip_str, e)
+
+                batch_results = ufw_manager_instance.block_targets(
+                    [(ip_obj, block_duration) for ip_obj, _ in high_rpm_blocks]
+                )
+                for (target_to_block_obj, reason), success in zip(high_rpm_blocks, batch_results):
+                    if success:
+                        blocked_targets_count += 1
+                        blocked_ips_high_rpm.add(target_to_block_obj) # Add the ipaddress object
+                        action = "Blocked" if not dry_run else "Dry Run - Blocked"
+                        # ALWAYS PRINT block actions, format based on silent mode
+                        if silent:
+                            print(f"{block_time_str} {action} {target_type}: {target_to_block_obj} for {block_duration}m. Reason: {reason}.")
+                        else:
+                            print(f" -> {action} {target_type}: {target_to_block_obj} for {block_duration} minutes. Reason: {reason}.")
+                    else:
+                        # Only print failure if not silent
+                        if not silent:
+                            action = "Failed to block" if not dry_run else "Dry Run - Failed"
+                            print(f" -> {action} {target_type}: {target_to_block_obj}.")
             else:
                 logger.info("No individual IPs exceeded the req/hour threshold.")
         else:
@@ -625,85 +671,95 @@ def main():
 
 
         # 1. Identify and Block /16 Supernets (Simplified Logic)
-        supernets_to_block = defaultdict(list)
-        # Iterate through the original threats list (dictionaries) as it contains the ipaddress objects needed for supernetting
-        for threat in threats: # Use the original list here
-            if threat.get('should_block'):
-                subnet = threat.get('id') # This is the ipaddress object
-                if isinstance(subnet, ipaddress.IPv4Network) and subnet.prefixlen == 24:
-                    try:
-                        supernet = subnet.supernet(new_prefix=16)
-                        supernets_to_block[supernet].append(threat) # Store the threat dict
-                    except ValueError:
-                        continue # Skip if supernet calculation fails
+        # Select blockable IPv4 /24 threats from threats_df (indexed by subnet string)
+        blockable_df = threats_df.iloc[0:0]
+        if not threats_df.empty:
+            is_ipv4_24 = threats_df.index.str.endswith('/24') & ~threats_df.index.str.contains(':', regex=False)
+            blockable_df = threats_df[threats_df['should_block'].to_numpy(dtype=bool) & is_ipv4_24]
+            # Score order (stable) so supernets and their members are listed best first
+            blockable_df = blockable_df.iloc[np.argsort(-blockable_df['strategy_score'].to_numpy(), kind='stable')]
+        # Pack them as uint32 network addresses; the /16 key is a bit mask
+        net_u32 = np.fromiter((int(subnet.network_address) for subnet in blockable_df.get('id', [])),
+                              dtype=np.uint32, count=len(blockable_df))
+        net_u32_by_id = pd.Series(net_u32, index=blockable_df.index, name='net_u32')
+        super16 = pd.Series(net_u32 & np.uint32(0xFFFF0000), index=blockable_df.index, name='super16')
+        # Count /24s per /16 and collect member subnets in one grouping pass (first-seen, i.e. score, order)
+        super16_groups = super16.groupby(super16, sort=False)
+        supernet_counts = super16_groups.size()
+        supernet_members = super16_groups.groups
+        eligible_supernets = supernet_counts[supernet_counts >= 2]
 
         # Process potential /16 blocks
-        logger.info(f"Checking {len(supernets_to_block)} /16 supernets for potential blocking (>= 2 contained blockable /24s)...")
-        for supernet, contained_blockable_threats in supernets_to_block.items():
-            if len(contained_blockable_threats) >= 2:
-                target_to_block_obj = supernet
-                target_id_str = str(target_to_block_obj) # String for strike history key
-                target_type = "Supernet /16"
-                # --- Strike Logic for Supernets ---
-                strike_count = len(strike_history.get(target_id_str, []))
-                escalated = strike_count >= args.block_escalation_strikes # Use new arg
-                block_duration = 1440 if escalated else args.block_duration
-                duration_info = f"(Escalated: {strike_count} strikes)" if escalated else f"({strike_count} strikes)"
-                # --- End Strike Logic ---
-                contained_ids_str = ", ".join([str(t['id']) for t in contained_blockable_threats])
-                reason = f"contains >= 2 blockable /24 subnets ({contained_ids_str})"
-
-                logger.info(f"Processing block for {target_type}: {target_to_block_obj}. Reason: {reason}. Duration: {block_duration}m {duration_info}")
-                success = ufw_manager_instance.block_target(
-                    subnet_or_ip_obj=target_to_block_obj,
-                    block_duration_minutes=block_duration
-                )
-                if success:
-                    blocked_targets_count += 1
-                    action = "Blocked" if not args.dry_run else "Dry Run - Blocked"
-                    timestamp_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    # ALWAYS PRINT block actions, format based on silent mode
-                    if args.silent:
-                         print(f"{timestamp_str} {action} {target_type}: {target_to_block_obj} for {block_duration}m {duration_info}. Reason: {reason}.")
-                    else:
-                         print(f" -> {action} {target_type}: {target_to_block_obj} for {block_duration} minutes {duration_info}. Reason: {reason}.")
-                    # --- Record Strike (only if not dry run) ---
-                    if not args.dry_run:
-                        now_iso = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-                        if target_id_str not in strike_history:
-                            strike_history[target_id_str] = []
-                        strike_history[target_id_str].append(now_iso)
-                    # --- End Record Strike ---
-                    for contained_threat in contained_blockable_threats:
-                        blocked_subnets_via_supernet.add(contained_threat['id'])
+        logger.info("Checking %s /16 supernets for potential blocking (>= 2 contained blockable /24s)...", len(supernet_counts))
+        target_type = "Supernet /16"
+        supernet_blocks = [] # Pending supernet blocks, sent to UFW below
+        for supernet_u32 in eligible_supernets.index:
+            contained_ids = supernet_members[supernet_u32] # Subnet strings, in score order
+            # Only materialize ipaddress objects for supernets actually blocked
+            target_to_block_obj = ipaddress.IPv4Network((int(supernet_u32), 16))
+            target_id_str = str(target_to_block_obj) # String for strike history key
+            # --- Strike Logic for Supernets ---
+            strike_count = len(strike_history.get(target_id_str, []))
+            escalated = strike_count >= escalation_strikes # Use new arg
+            block_duration = 1440 if escalated else default_block_duration
+            duration_info = f"(Escalated: {strike_count} strikes)" if escalated else f"({strike_count} strikes)"
+            # --- End Strike Logic ---
+            # List only the first few contained /24s; the full list is logged at DEBUG
+            contained_ids_str = ", ".join(contained_ids[:SUPERNET_REASON_MAX_IDS])
+            if len(contained_ids) > SUPERNET_REASON_MAX_IDS:
+                contained_ids_str += f", +{len(contained_ids) - SUPERNET_REASON_MAX_IDS} more"
+            reason = f"contains {len(contained_ids)} blockable /24 subnets ({contained_ids_str})"
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s %s contains: %s", target_type, target_to_block_obj, ", ".join(contained_ids))
+
+            logger.info("Processing block for %s: %s. Reason: %s. Duration: %sm %s",
+                        target_type, target_to_block_obj, reason, block_duration, duration_info)
+            supernet_blocks.append((target_to_block_obj, target_id_str, block_duration, duration_info, reason, contained_ids))
+
+        batch_results = ufw_manager_instance.block_targets(
+            [(block[0], block[2]) for block in supernet_blocks]
+        )
+        for (target_to_block_obj, target_id_str, block_duration, duration_info, reason, contained_ids), success in zip(supernet_blocks, batch_results):
+            if success:
+                blocked_targets_count += 1
+                action = "Blocked" if not dry_run else "Dry Run - Blocked"
+                # ALWAYS PRINT block actions, format based on silent mode
+                if silent:
+                     print(f"{block_time_str} {action} {target_type}: {target_to_block_obj} for {block_duration}m {duration_info}. Reason: {reason}.")
                 else:
-                    # Only print failure if not silent
-                    if not args.silent:
-                        action = "Failed to block" if not args.dry_run else "Dry Run - Failed"
-                        print(f" -> {action} {target_type}: {target_to_block_obj}.")
+                     print(f" -> {action} {target_type}: {target_to_block_obj} for {block_duration} minutes {duration_info}. Reason: {reason}.")
+                # --- Record Strike (only if not dry run) ---
+                if not dry_run:
+                    if target_id_str not in strike_history:
+                        strike_history[target_id_str] = []
+                    strike_history[target_id_str].append(strike_time_iso)
+                # --- End Record Strike ---
+                covered_u32.update(net_u32_by_id.loc[contained_ids].tolist())
+            else:
+                # Only print failure if not silent
+                if not silent:
+                    action = "Failed to block" if not dry_run else "Dry Run - Failed"
+                    print(f" -> {action} {target_type}: {target_to_block_obj}.")
 
 
         # 2. Process individual /24 or /64 Blocks (Top N from the *original* sorted list)
-        logger.info(f"Processing top {args.top} individual threat blocks (/24 or /64) based on strategy '{strategy_name}'...")
-        top_threats_to_consider = threats[:args.top] # Use the original list for blocking logic
+        logger.info("Processing top %s individual threat blocks (/24 or /64) based on strategy '%s'...", top_n, strategy_name)
+        top_threats_to_consider = [threats[i] for i in top_positions] # Threat dicts, best score first
+        individual_blocks = [] # Pending individual blocks, sent to UFW below
         for threat in top_threats_to_consider:
             target_id_obj = threat['id'] # ipaddress object
 
-            # Skip if this subnet was already covered by a /16 block (compare ipaddress objects)
-            if target_id_obj in blocked_subnets_via_supernet:
-                # Attempt to find the blocking supernet for logging
-                blocking_supernet_str = "Unknown"
-                if isinstance(target_id_obj, ipaddress.IPv4Network) and target_id_obj.prefixlen == 24:
-                    try:
-                        blocking_supernet_str = str(target_id_obj.supernet(new_prefix=16))
-                    except ValueError: pass
-                logger.info(f"Skipping block for {target_id_obj}: Already covered by blocked supernet {blocking_supernet_str}.")
+            # Skip if this subnet was already covered by a /16 block (integer lookup, IPv4 only)
+            tid_u32 = int(target_id_obj.network_address) if target_id_obj.version == 4 else None
+            if tid_u32 in covered_u32:
+                blocking_supernet_str = str(ipaddress.IPv4Network((tid_u32 & 0xFFFF0000, 16)))
+                logger.info("Skipping block for %s: Already covered by blocked supernet %s.", target_id_obj, blocking_supernet_str)
                 continue
 
             if threat.get('should_block'):
                 target_to_block_obj = target_id_obj
                 target_type = "Subnet"
-                block_duration = args.block_duration # Use general block duration here
+                block_duration = default_block_duration # Use general block duration here
 
                 # Check for single IP subnet
                 single_ip_obj_for_check = None # Store potential single IP object
@@ -714,198 +770,170 @@ def main():
                         target_to_block_obj = ipaddress.ip_address(single_ip_str) # Convert back to object for UFW
                         single_ip_obj_for_check = target_to_block_obj # Keep the object for high RPM check
                         target_type = "Single IP"
-                        logger.info(f"Threat {threat['id']} has only 1 IP. Targeting IP {target_to_block_obj} instead of the whole subnet.")
+                        logger.info("Threat %s has only 1 IP. Targeting IP %s instead of the whole subnet.", threat['id'], target_to_block_obj)
                     except (IndexError, KeyError, ValueError, TypeError) as e:
-                        logger.warning(f"Could not extract/convert single IP from details for subnet {threat['id']} despite ip_count=1: {e}. Blocking subnet instead.")
+                        logger.warning("Could not extract/convert single IP from details for subnet %s despite ip_count=1: %s. Blocking subnet instead.", threat['id'], e)
                         target_type = "Subnet"
                         target_to_block_obj = threat['id']
 
                 # Skip if this specific IP was already blocked due to high RPM
                 if single_ip_obj_for_check and single_ip_obj_for_check in blocked_ips_high_rpm:
-                    logger.info(f"Skipping block for {target_type} {target_to_block_obj}: Already blocked due to high req/hour.")
+                    logger.info("Skipping block for %s %s: Already blocked due to high req/hour.", target_type, target_to_block_obj)
                     continue
 
                 # --- Strike Logic for Individual Threats ---
                 target_id_str = str(target_to_block_obj) # String for strike history key
                 strike_count = len(strike_history.get(target_id_str, []))
-                escalated = strike_count >= args.block_escalation_strikes # Use new arg
-                block_duration = 1440 if escalated else args.block_duration
+                escalated = strike_count >= escalation_strikes # Use new arg
+                block_duration = 1440 if escalated else default_block_duration
                 duration_info = f"(Escalated: {strike_count} strikes)" if escalated else f"({strike_count} strikes)"
                 # --- End Strike Logic ---
 
                 block_reason = threat.get('block_reason', 'Strategy threshold met') # Get reason
 
-                logger.info(f"Processing block for {target_type}: {target_to_block_obj}. Reason: {block_reason}. Duration: {block_duration}m {duration_info}")
-                success = ufw_manager_instance.block_target(
-                    subnet_or_ip_obj=target_to_block_obj,
-                    block_duration_minutes=block_duration # Use general duration for strategy blocks
-                )
-                if success:
-                    blocked_targets_count += 1
-                    action = "Blocked" if not args.dry_run else "Dry Run - Blocked"
-                    timestamp_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-                    # --- Construct metrics summary string for block message ---
-                    try:
-                        # Helper functions for safe numeric retrieval and conversion
-                        def _safe_get_float(val, default=0.0):
-                            if val is None: return default
-                            if isinstance(val, (int, float)): return float(val)
-                            try: return float(val) # Attempt conversion if string or other
-                            except (ValueError, TypeError): return default
-
-                        def _safe_get_int(val, default=0):
-                            if val is None: return default
-                            if isinstance(val, (int, float)): return int(val) # Handles float to int conversion
-                            try: return int(float(val)) # Attempt conversion to float first, then int
-                            except (ValueError, TypeError): return default
-
-                        total_requests_val = _safe_get_int(threat.get('total_requests'))
-                        ip_count_val = _safe_get_int(threat.get('ip_count'))
-                        strategy_score_val = _safe_get_float(threat.get('strategy_score'))
-                        subnet_req_min_win_val = _safe_get_float(threat.get('subnet_req_per_min_window'))
-                        subnet_req_hour_val = _safe_get_float(threat.get('subnet_req_per_hour'))
-                        subnet_time_span_val = _safe_get_float(threat.get('subnet_time_span'))
-
-                        metrics_summary = (
-                            f"Metrics: "
-                            f"{total_requests_val:d} reqs, "
-                            f"{ip_count_val:d} IPs, "
-                            f"Score: {strategy_score_val:.1f}, "
-                            f"Req/Min(Win): {subnet_req_min_win_val:.1f}, "
-                            f"Req/Hour(Win): {subnet_req_hour_val:.1f}, "
-                            f"TimeSpan: {subnet_time_span_val:.0f}s"
-                        )
-                    except Exception as e:
-                         logger.warning(f"Could not format metrics for block message of {target_to_block_obj}: {e}", exc_info=True)
-                         metrics_summary = "Metrics: N/A"
-                    # --- End metrics summary string ---
+                logger.info("Processing block for %s: %s. Reason: %s. Duration: %sm %s", target_type, target_to_block_obj, block_reason, block_duration, duration_info)
+                individual_blocks.append((threat, target_to_block_obj, target_type, target_id_str, block_duration, duration_info, block_reason))
 
-                    # ALWAYS PRINT block actions, format based on silent mode
-                    if args.silent:
-                        print(f"{timestamp_str} {action} {target_type}: {target_to_block_obj} for {block_duration}m {duration_info}. Reason: {block_reason}. {metrics_summary}")
-                    else:
-                        # Append the metrics_summary and duration_info to the print statement for non-silent
-                        print(f" -> {action} {target_type}: {target_to_block_obj} for {block_duration} minutes {duration_info}. Reason: {block_reason}. {metrics_summary}")
+        batch_results = ufw_manager_instance.block_targets(
+            [(block[1], block[4]) for block in individual_blocks] # Use general duration for strategy blocks
+        )
+        for (threat, target_to_block_obj, target_type, target_id_str, block_duration, duration_info, block_reason), success in zip(individual_blocks, batch_results):
+            if success:
+                blocked_targets_count += 1
+                action = "Blocked" if not dry_run else "Dry Run - Blocked"
 
-                    # --- Record Strike (only if not dry run) ---
-                    if not args.dry_run:
-                        now_iso = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-                        if target_id_str not in strike_history:
-                            strike_history[target_id_str] = []
-                        strike_history[target_id_str].append(now_iso)
-                    # --- End Record Strike ---
+                # --- Construct metrics summary string for block message ---
+                try:
+                    metrics_summary = BLOCK_METRICS_TPL % (
+                        _safe_get_int(threat.get('total_requests')),
+                        _safe_get_int(threat.get('ip_count')),
+                        _safe_get_float(threat.get('strategy_score')),
+                        _safe_get_float(threat.get('subnet_req_per_min_window')),
+                        _safe_get_float(threat.get('subnet_req_per_hour')),
+                        _safe_get_float(threat.get('subnet_time_span')),
+                    )
+                except Exception as e:
+                     logger.warning("Could not format metrics for block message of %s: %s", target_to_block_obj, e, exc_info=True)
+                     metrics_summary = "Metrics: N/A"
+                # --- End metrics summary string ---
 
+                # ALWAYS PRINT block actions, format based on silent mode
+                if silent:
+                    print(f"{block_time_str} {action} {target_type}: {target_to_block_obj} for {block_duration}m {duration_info}. Reason: {block_reason}. {metrics_summary}")
                 else:
-                    # Only print failure if not silent
-                    if not args.silent:
-                        action = "Failed to block" if not args.dry_run else "Dry Run - Failed"
-                        print(f" -> {action} {target_type}: {target_to_block_obj}.")
+                    # Append the metrics_summary and duration_info to the print statement for non-silent
+                    print(f" -> {action} {target_type}: {target_to_block_obj} for {block_duration} minutes {duration_info}. Reason: {block_reason}. {metrics_summary}")
+
+                # --- Record Strike (only if not dry run) ---
+                if not dry_run:
+                    if target_id_str not in strike_history:
+                        strike_history[target_id_str] = []
+                    strike_history[target_id_str].append(strike_time_iso)
+                # --- End Record Strike ---
+
+            else:
+                # Only print failure if not silent
+                if not silent:
+                    action = "Failed to block" if not dry_run else "Dry Run - Failed"
+                    print(f" -> {action} {target_type}: {target_to_block_obj}.")
 
         # --- Save Strike History (only if not dry run) ---
-        if not args.dry_run:
+        if not dry_run:
             save_strike_history(args.strike_file, strike_history)
         else:
             logger.info("Dry run mode: Strike history not saved.")
         # --- End Save Strike History ---
 
-        if not args.silent:
-            print(f"Block processing complete. {blocked_targets_count} targets {'would be' if args.dry_run else 'were'} processed for blocking.")
+        if not silent:
+            print(f"Block processing complete. {blocked_targets_count} targets {'would be' if dry_run else 'were'} processed for blocking.")
             print("-" * 30)
     else:
         logger.info("Blocking is disabled (--block not specified).")
 
 
     # --- Reporting Logic ---
+    # Report lines are collected here and written to stdout once at the end
+    report_lines = []
+    emit = report_lines.append
     # Suppress reporting if silent mode is active
-    if not args.silent:
-        top_count = min(args.top, len(threats))
-        print(f"\n=== TOP {top_count} INDIVIDUAL THREATS DETECTED (/24 or /64) (Sorted by Strategy Score: '{strategy_name}') ===")
+    if not silent:
+        top_count = len(top_positions)
+        emit(f"\n=== TOP {top_count} INDIVIDUAL THREATS DETECTED (/24 or /64) (Sorted by Strategy Score: '{strategy_name}') ===")
         if args.block:
-            action = "Blocked" if not args.dry_run else "[DRY RUN] Marked for blocking"
-            print(f"--- {action} based on strategy '{strategy_name}' criteria applied to top {args.top} threats ---")
-            print(f"--- NOTE: /16 supernets containing >= 2 blockable /24s may have been blocked instead ---")
+            action = "Blocked" if not dry_run else "[DRY RUN] Marked for blocking"
+            emit(f"--- {action} based on strategy '{strategy_name}' criteria applied to top {top_n} threats ---")
+            emit(f"--- NOTE: /16 supernets containing >= 2 blockable /24s may have been blocked instead ---")
 
-        top_threats_report = threats[:top_count] # Use original list for reporting top N
+        # threats_df rows share positions with threats, so the top N ranking applies directly
+        top_threats_report = threats_df.iloc[top_positions]
 
-        for i, threat in enumerate(top_threats_report, 1):
-            target_id_obj = threat['id'] # ipaddress object
-            target_id_str = str(target_id_obj)
-            strat_score_str = f"Score: {threat.get('strategy_score', 0):.2f}"
+        for i, threat in enumerate(top_threats_report.itertuples(), 1):
+            target_id_obj = threat.id # ipaddress object
+            target_id_str = threat.Index
 
-            # Construct detailed metrics summary string (using .get() on the threat dict) - ADDED Req/Hour
-            total_req_val = threat.get('total_requests', 0)
+            # Construct detailed metrics summary string from the threat row - ADDED Req/Hour
+            total_req_val = threat.total_requests
             if total_req_val is None or pd.isna(total_req_val): total_req_val = 0
-            total_req_val = int(total_req_val)
-
-            metrics_summary = (
-                f"{total_req_val:d} reqs, "
-                f"{threat.get('ip_count', 0):d} IPs, "
-                # Removed IP RPMs
-                # Removed Subnet Total RPMs
-                f"Req/Min(Win): {threat.get('subnet_req_per_min_window', 0):.1f}, "
-                f"Req/Hour(Win): {threat.get('subnet_req_per_hour', 0):.1f}, "
-                f"TimeSpan: {threat.get('subnet_time_span', 0):.0f}s"
-            )
 
             block_info = ""
-            # Determine block status for reporting (using ipaddress object for check)
-            is_blockable = threat.get('should_block', False)
-            is_top_n = i <= args.top
-            covered_by_supernet = target_id_obj in blocked_subnets_via_supernet # Check using object
+            # Determine block status for reporting (supernet coverage is an integer lookup)
+            is_blockable = threat.should_block
+            is_top_n = i <= top_n
+            covered_by_supernet = target_id_obj.version == 4 and int(target_id_obj.network_address) in covered_u32
 
             if args.block:
                 if covered_by_supernet:
                     block_info = f" [COVERED BY /16 BLOCK]"
                 elif is_blockable and is_top_n:
                     # Block status is already printed during the blocking phase, maybe add reason here?
-                    block_reason_str = f" ({threat.get('block_reason', 'No reason')})" if threat.get('block_reason') else ""
+                    block_reason_str = f" ({threat.block_reason})" if pd.notna(threat.block_reason) else ""
                     # Indicate it was processed for blocking
                     block_info = f" [PROCESSED FOR BLOCKING]{block_reason_str}"
 
 
-            print(f"\n#{i} Subnet: {target_id_str} - {strat_score_str}{block_info}")
-            print(f"  Metrics: {metrics_summary}")
+            emit(REPORT_THREAT_TPL % (i, target_id_str, threat.strategy_score, block_info))
+            emit(REPORT_METRICS_TPL % (total_req_val, threat.ip_count, threat.subnet_req_per_min_window,
+                                       threat.subnet_req_per_hour, threat.subnet_time_span))
 
-            # Use details from the threat dictionary
-            if threat.get('details'):
-                print("  -> Top IPs (by Max RPM):")
+            # Use details from the threat row
+            if threat.details:
+                emit("  -> Top IPs (by Max RPM):")
                 # Limit details shown in console report if desired
                 max_details_to_show = 5
-                actual_details_list = threat['details']
+                actual_details_list = threat.details
                 num_printed_details = 0
                 for ip_detail_idx, ip_detail in enumerate(actual_details_list):
                     if ip_detail_idx < max_details_to_show:
-                        print(f"     - IP: {ip_detail['ip']} ({ip_detail['total_requests']} reqs, AvgRPM: {ip_detail['avg_rpm']:.2f}, MaxRPM: {ip_detail['max_rpm']:.0f})")
+                        emit(REPORT_IP_DETAIL_TPL % (ip_detail['ip'], ip_detail['total_requests'], ip_detail['avg_rpm'], ip_detail['max_rpm']))
                         num_printed_details += 1
                     else:
                         break
                 
-                total_ip_count_for_subnet = threat.get('ip_count', 0)
+                total_ip_count_for_subnet = threat.ip_count
                 if total_ip_count_for_subnet > num_printed_details:
                     remaining_ips = total_ip_count_for_subnet - num_printed_details
-                    print(f"     ... and {remaining_ips} more IPs in this subnet.")
+                    emit(f"     ... and {remaining_ips} more IPs in this subnet.")
             else:
-                 print("  -> No IP details available.")
+                 emit("  -> No IP details available.")
 
     # --- Final Summary ---
     # Print simplified summary in silent mode
-    if not args.silent:
-        print(f"\nAnalysis completed using strategy '{strategy_name}'.")
+    if not silent:
+        emit(f"\nAnalysis completed using strategy '{strategy_name}'.")
     # Always print the blocked count summary
-    print(f"{blocked_targets_count} unique targets (subnets/IPs or /16 supernets) {'blocked' if not args.dry_run else 'marked for blocking'} in this execution.")
-    if not args.silent:
+    emit(f"{blocked_targets_count} unique targets (subnets/IPs or /16 supernets) {'blocked' if not dry_run else 'marked for blocking'} in this execution.")
+    if not silent:
         # Use len(threats) which is the original list count
-        print(f"From a total of {len(threats)} detected individual threats.")
+        emit(f"From a total of {len(threats)} detected individual threats.")
         if args.block:
-            print(f"Use '--clean-rules' periodically to remove expired rules.")
+            emit(f"Use '--clean-rules' periodically to remove expired rules.")
 
     # --- Report Overall Maximums ---
     # Suppress if silent
-    if not args.silent:
-        print(f"\n=== OVERALL MAXIMUMS OBSERVED ===")
+    if not silent:
+        emit(f"\n=== OVERALL MAXIMUMS OBSERVED ===")
         if not max_metrics_data_for_reporting or all(data['value'] == -1 for data in max_metrics_data_for_reporting.values()): # MODIFIED to use new dict name
-            print("  No threat data available or maximums could not be determined.")
+            emit("  No threat data available or maximums could not be determined.")
         else:
             for metric_key, data in max_metrics_data_for_reporting.items(): # MODIFIED
                 metric_name = metric_names_map.get(metric_key, metric_key)
@@ -920,19 +948,19 @@ def main():
                             value_str = f"{percentage:.1f}% ({value:.0f}s raw)"
                         else:
                             value_str = f"N/A ({value:.0f}s raw)"
-                    elif isinstance(value, float):
+                    elif isinstance(value, (float, np.floating)): # Downcast columns yield NumPy scalars
                         value_str = f"{value:.2f}"
                     else: # Should be int or similar
                         value_str = str(int(value)) # Ensure integer representation if applicable
 
-                print(f"  {metric_name}: {value_str} (Achieved by: {', '.join(subnets)})")
+                emit(f"  {metric_name}: {value_str} (Achieved by: {', '.join(subnets)})")
 
     # --- Report Details for Subnets Achieving Maximums ---
     # Suppress if silent
-    if not args.silent:
-        print(f"\n=== DETAILS FOR SUBNETS ACHIEVING MAXIMUMS ===")
+    if not silent:
+        emit(f"\n=== DETAILS FOR SUBNETS ACHIEVING MAXIMUMS ===")
         if threats_df.empty:
-            print("  No data available to report maximum-achieving subnets.")
+            emit("  No data available to report maximum-achieving subnets.")
         else:
             # Collect unique subnet IDs (strings) that achieved any maximum
             max_achieving_subnet_ids = set()
@@ -941,67 +969,71 @@ def main():
                     max_achieving_subnet_ids.update(data['subnets'])
 
             if not max_achieving_subnet_ids:
-                print("  No subnets achieved any maximum values.")
+                emit("  No subnets achieved any maximum values.")
             else:
-                logger.info(f"Reporting details for {len(max_achieving_subnet_ids)} subnets that achieved at least one maximum.")
+                logger.info("Reporting details for %s subnets that achieved at least one maximum.", len(max_achieving_subnet_ids))
                 # Filter the DataFrame to get only the rows for these subnets
                 max_subnets_df = threats_df[threats_df.index.isin(max_achieving_subnet_ids)]
 
                 # Sort by index (subnet string) for consistent reporting order
                 max_subnets_df = max_subnets_df.sort_index()
+                # Achiever sets for O(1) membership (ties can make every subnet an achiever)
+                achiever_sets = {metric_key: set(data['subnets']) for metric_key, data in max_metrics_data_for_reporting.items()}
 
                 for subnet_id_str, threat_row in max_subnets_df.iterrows():
                     # Find which maximums this subnet achieved
                     achieved_max_metrics = []
                     for metric_key, data in max_metrics_data_for_reporting.items(): # MODIFIED
-                        if subnet_id_str in data['subnets']:
+                        if subnet_id_str in achiever_sets[metric_key]:
                             achieved_max_metrics.append(metric_names_map.get(metric_key, metric_key))
                     achieved_max_str = f" [Achieved Max: {', '.join(achieved_max_metrics)}]" if achieved_max_metrics else ""
 
                     # Reuse the metrics summary string generation from the DataFrame row - ADDED Req/Hour
                     total_req_val = threat_row.get('total_requests', 0)
                     if total_req_val is None or pd.isna(total_req_val): total_req_val = 0
-                    total_req_val = int(total_req_val)
-
-                    metrics_summary = (
-                        f"{total_req_val:d} reqs, "
-                        f"{threat_row.get('ip_count', 0):d} IPs, "
-                        # Removed IP RPMs
-                        # Removed Subnet Total RPMs
-                        # Removed subnet_req_per_min
-                        f"Req/Min(Win): {threat_row.get('subnet_req_per_min_window', 0):.1f}, "
-                        f"Req/Hour(Win): {threat_row.get('subnet_req_per_hour', 0):.1f}, " # ADDED
-                        f"TimeSpan: {threat_row.get('subnet_time_span', 0):.0f}s"
-                    )
 
-                    print(f"\nSubnet: {subnet_id_str}{achieved_max_str}")
-                    print(f"  Metrics: {metrics_summary}")
+                    emit(f"\nSubnet: {subnet_id_str}{achieved_max_str}")
+                    emit(REPORT_METRICS_TPL % (total_req_val, threat_row.get('ip_count', 0),
+                                               threat_row.get('subnet_req_per_min_window', 0),
+                                               threat_row.get('subnet_req_per_hour', 0),
+                                               threat_row.get('subnet_time_span', 0)))
                     # Optionally print top IPs again if desired, accessing 'details' from the row
                     details = threat_row.get('details', [])
                     if details and isinstance(details, list):
-                        print("  -> Top IPs (by Max RPM):")
+                        emit("  -> Top IPs (by Max RPM):")
                         max_details_to_show = 3 # Show fewer details here?
                         num_printed_details = 0
                         for ip_detail_idx, ip_detail in enumerate(details):
                             if ip_detail_idx < max_details_to_show:
                                  # Ensure ip_detail is a dict before accessing keys
                                  if isinstance(ip_detail, dict):
-                                     print(f"     - IP: {ip_detail.get('ip','N/A')} ({ip_detail.get('total_requests',0)} reqs, AvgRPM: {ip_detail.get('avg_rpm',0):.2f}, MaxRPM: {ip_detail.get('max_rpm',0):.0f})")
+                                     emit(REPORT_IP_DETAIL_TPL % (ip_detail.get('ip','N/A'), ip_detail.get('total_requests',0), ip_detail.get('avg_rpm',0), ip_detail.get('max_rpm',0)))
                                      num_printed_details += 1
                                  else:
-                                     print(f"     - Invalid detail format: {ip_detail}")
+                                     emit(f"     - Invalid detail format: {ip_detail}")
                             else:
                                 break
                         
                         total_ip_count_for_subnet = threat_row.get('ip_count', 0)
                         if total_ip_count_for_subnet > num_printed_details:
                             remaining_ips = total_ip_count_for_subnet - num_printed_details
-                            print(f"     ... and {remaining_ips} more IPs in this subnet.")
+                            emit(f"     ... and {remaining_ips} more IPs in this subnet.")
                     # else:
-                    #      print("  -> No IP details available.") # Redundant if details is empty list
+                    #      emit("  -> No IP details available.") # Redundant if details is empty list
 
     # --- End Report Details for Subnets Achieving Maximums ---
 
+    # Write the whole report in one call instead of one print per line
+    if report_lines:
+        sys.stdout.write("\n".join(report_lines) + "\n")
+
+    # --- Export Results (all threats, ranked by strategy score) ---
+    if args.output:
+        if analyzer.export_results(args.format, args.output, config=args):
+            logger.info("Results exported to %s", args.output)
+        else:
+            logger.error("Could not export results to %s", args.output)
+
 
 if __name__ == '__main__':
     main()
@@ -3,57 +3,265 @@
 Module for parsing web server logs and loading them into Pandas DataFrames.
 """
 import re
-from datetime import datetime, timezone
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
 import ipaddress
 import logging
 import math
+import mmap
+import numpy as np
 import pandas as pd
 import os # Needed for _read_lines_reverse
+import queue
+import socket # inet_pton for whitelist lookups
+import threading
+from itertools import compress
+from operator import itemgetter
 
 # Logger for this module
 logger = logging.getLogger('botstats.parser')
 
-# Pre-compile log pattern for efficiency
+# Pre-compile log pattern for efficiency. Only the IP and datetime are captured;
+# request, status, size, referer and user agent are matched (so malformed lines are
+# still skipped) but not extracted, since the analysis never reads them.
 LOG_PATTERN = re.compile(
-    r'(?P<ip>\S+) \S+ \S+ \[(?P<datetime>[^\]]+)\] "(?P<request>[^"]+)" '
-    r'(?P<status>\d{3}) (?P<size>\S+) "(?P<referer>[^"]+)" "(?P<useragent>[^"]+)"'
+    r'(?P<ip>\S+) \S+ \S+ \[(?P<datetime>[^\]]+)\] "[^"]+" '
+    r'\d{3} \S+ "[^"]+" "[^"]+"'
+)
+# Same pattern for whole undecoded blocks of lines: one match per line (re.M '^' plus a lazy
+# prefix keeps search()'s leftmost match), with character classes kept from crossing newlines
+BUFFER_LOG_PATTERN = re.compile(
+    rb'^[^\n]*?(\S+) \S+ \S+ \[([^\]\n]+)\] "[^"\n]+" '
+    rb'\d{3} \S+ "[^"\n]+" "[^"\n]+"',
+    re.MULTILINE
 )
 
 # Helper function for efficient reverse reading (copied from threat_analyzer)
-def _read_lines_reverse(filename, buf_size=8192):
-    """Read a file line by line backwards, memory efficiently."""
-    # ... (Implementation of _read_lines_reverse - unchanged) ...
-    with open(filename, 'rb') as f:
-        segment = None
-        offset = 0
-        f.seek(0, os.SEEK_END)
-        file_size = remaining_size = f.tell()
-        while remaining_size > 0:
-            offset = min(file_size, offset + buf_size)
-            f.seek(file_size - offset)
-            buffer = f.read(min(remaining_size, buf_size))
-            try:
-                buffer_str = buffer.decode('utf-8')
-            except UnicodeDecodeError:
-                buffer_str = buffer.decode('utf-8', errors='ignore')
-
-            remaining_size -= buf_size
-            lines = buffer_str.splitlines(True)
-            if segment is not None:
-                if buffer_str[-1] != '\n':
-                     lines[-1] += segment
-                else:
-                    yield segment
-            segment = lines[0]
-            for i in range(len(lines) - 1, 0, -1):
-                 if lines[i]:
-                     yield lines[i]
-        if segment is not None:
-            yield segment
+def _read_lines_reverse(filename, buf_size=1 << 20):
+    """
+    Read a file line by line backwards, memory efficiently.
+
+    Blocks of buf_size bytes are read from the end of the file into one reused
+    buffer. Only whole lines are decoded (one decode per block); the partial line
+    at the start of each block is carried over and completed by the previous block.
+    """
+    with open(filename, 'rb', buffering=0) as f:
+        buffer = bytearray(buf_size)
+        view = memoryview(buffer)
+        position = os.fstat(f.fileno()).st_size
+        carry = b''
+        while position > 0:
+            size = min(buf_size, position)
+            position -= size
+            f.seek(position)
+            filled = 0
+            while filled < size:
+                read = f.readinto(view[filled:size])
+                if not read:
+                    break
+                filled += read
+            data = view[:filled].tobytes() + carry
+            if position > 0:
+                # Everything up to the first newline may continue in the previous block
+                first_newline = data.find(b'\n')
+                if first_newline == -1:
+                    carry = data
+                    continue
+                carry = data[:first_newline + 1]
+                data = data[first_newline + 1:]
+            lines = data.decode('utf-8', errors='ignore').splitlines(True)
+            for i in range(len(lines) - 1, -1, -1):
+                yield lines[i]
+
+
+# Month abbreviations of the common log format timestamp ('%d/%b/%Y:%H:%M:%S %z')
+_MONTHS = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+           'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
+# Local UTC offset, computed once at import; applied to log timestamps without an explicit offset
+_LOCAL_OFFSET = datetime.now().astimezone().utcoffset()
+_LOCAL_OFFSET_SECONDS = int(_LOCAL_OFFSET.total_seconds())
+# '+zzzz'/'-zzzz' suffix -> signed offset in seconds, filled on first use (logs rarely carry more than two)
+_TZ_OFFSETS = {}
+# 'dd/Mon/YYYY' prefix -> epoch seconds at 00:00 UTC of that date, filled on first use
+_DAY_EPOCHS = {}
+_EPOCH_DATE = datetime(1970, 1, 1).date()
+
+def local_to_utc(dt_naive):
+    """Converts a naive local datetime to an aware UTC datetime, using the local offset in effect at that date."""
+    return dt_naive.astimezone().astimezone(timezone.utc)
+
+def _tz_offset_seconds(tz_str):
+    """Returns the signed offset in seconds for a '+hhmm'/'-hhmm' string, or None if malformed."""
+    offset = _TZ_OFFSETS.get(tz_str)
+    if offset is None:
+        sign = tz_str[0]
+        if sign not in '+-' or not tz_str[1:].isdigit():
+            return None
+        offset = int(tz_str[1:3]) * 3600 + int(tz_str[3:5]) * 60
+        if sign == '-':
+            offset = -offset
+        _TZ_OFFSETS[tz_str] = offset
+    return offset
+
+def _day_epoch(date_str):
+    """Returns epoch seconds at 00:00 UTC for a 'dd/Mon/YYYY' string, or None if invalid."""
+    day_epoch = _DAY_EPOCHS.get(date_str)
+    if day_epoch is None:
+        month = _MONTHS.get(date_str[3:6])
+        if month is None:
+            return None
+        try:
+            date = datetime(int(date_str[7:11]), month, int(date_str[0:2])).date()
+        except ValueError:
+            return None
+        day_epoch = (date - _EPOCH_DATE).days * 86400
+        _DAY_EPOCHS[date_str] = day_epoch
+    return day_epoch
+
+def parse_epoch(dt_str):
+    """
+    Parses a 'dd/Mon/YYYY:HH:MM:SS [+zzzz]' timestamp into integer epoch seconds (UTC).
+
+    Slices the fixed field offsets instead of using strptime or a regex; the date part
+    and the offset suffix are resolved through caches, so most lines cost a few int() calls.
+
+    Args:
+        dt_str (str): Timestamp as found in the log line (offset optional; local time if absent).
+
+    Returns:
+        int: Seconds since the Unix epoch, or None if the string does not match.
+    """
+    length = len(dt_str)
+    if (length != 20 and length != 26) or dt_str[2] != '/' or dt_str[6] != '/' \
+            or dt_str[11] != ':' or dt_str[14] != ':' or dt_str[17] != ':':
+        return None
+    day_epoch = _day_epoch(dt_str[:11])
+    if day_epoch is None:
+        return None
+    try:
+        hour, minute, second = int(dt_str[12:14]), int(dt_str[15:17]), int(dt_str[18:20])
+    except ValueError:
+        return None
+    if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 60):
+        return None
+    epoch = day_epoch + hour * 3600 + minute * 60 + second
+    if length == 20:
+        return epoch - _LOCAL_OFFSET_SECONDS
+    if dt_str[20] != ' ':
+        return None
+    offset = _tz_offset_seconds(dt_str[21:])
+    if offset is None:
+        return None
+    return epoch - offset
+
+# Batch parser tables: month abbreviations as 24-bit character codes, sorted for searchsorted
+_MONTH_CODES = np.array(sorted((ord(m[0]) << 16) | (ord(m[1]) << 8) | ord(m[2]) for m in _MONTHS), dtype=np.int64)
+_MONTH_NUMBERS = np.array([_MONTHS[chr(c >> 16) + chr((c >> 8) & 0xFF) + chr(c & 0xFF)] for c in _MONTH_CODES], dtype=np.int64)
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+_TS_DIGIT_POSITIONS = [0, 1, 7, 8, 9, 10, 12, 13, 15, 16, 18, 19]
+
+def parse_epochs(dt_strs):
+    """
+    Vectorized parse_epoch over a sequence of timestamp strings.
+
+    The strings are laid out as a fixed-width code point matrix and every field is
+    decoded column-wise with NumPy (digits, month table, calendar arithmetic), so the
+    per-string cost is a handful of array operations instead of Python calls.
+    Strings that do not fit the fixed layout go through parse_datetime_to_utc.
+
+    Args:
+        dt_strs (list): Timestamp strings as found in the log lines (all str, or all raw bytes).
+
+    Returns:
+        tuple: (epochs, parsed) where epochs is an int64 array of epoch seconds and
+               parsed a bool array, False for entries that could not be parsed.
+    """
+    n = len(dt_strs)
+    epochs = np.zeros(n, dtype=np.int64)
+    if n == 0:
+        return epochs, np.ones(0, dtype=np.bool_)
+    lengths = np.fromiter(map(len, dt_strs), dtype=np.int64, count=n)
+    # One contiguous row per character position, so each field below is a contiguous slice;
+    # raw bytes are laid out directly, without decoding
+    if isinstance(dt_strs[0], bytes):
+        chars = np.array(dt_strs, dtype='S26').view(np.uint8)
+    else:
+        chars = np.array(dt_strs, dtype='U26').view(np.uint32)
+    chars = chars.reshape(n, 26).T.astype(np.int64, order='C')
+
+    valid = (lengths == 20) | (lengths == 26)
+    for position, separator in ((2, '/'), (6, '/'), (11, ':'), (14, ':'), (17, ':')):
+        valid &= chars[position] == ord(separator)
+    digits = chars - 48
+    for position in _TS_DIGIT_POSITIONS:
+        valid &= (digits[position] >= 0) & (digits[position] <= 9)
+
+    month_code = (chars[3] << 16) | (chars[4] << 8) | chars[5]
+    month_index = np.minimum(np.searchsorted(_MONTH_CODES, month_code), len(_MONTH_CODES) - 1)
+    valid &= _MONTH_CODES[month_index] == month_code
+    month = np.where(valid, _MONTH_NUMBERS[month_index], 1)
+
+    day = digits[0] * 10 + digits[1]
+    year = digits[7] * 1000 + digits[8] * 100 + digits[9] * 10 + digits[10]
+    hour = digits[12] * 10 + digits[13]
+    minute = digits[15] * 10 + digits[16]
+    second = digits[18] * 10 + digits[19]
+    leap = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+    month_length = _DAYS_IN_MONTH[month] + ((month == 2) & leap)
+    valid &= (year >= 1) & (day >= 1) & (day <= month_length) & (hour < 24) & (minute < 60) & (second < 60)
 
+    # Days since 1970-01-01 for the proleptic Gregorian calendar (days_from_civil)
+    shifted_year = year - (month <= 2)
+    era = shifted_year // 400
+    year_of_era = shifted_year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    days = era * 146097 + day_of_era - 719468
+
+    # Offset: '+hhmm'/'-hhmm' after a space, or the local offset when absent
+    has_offset = lengths == 26
+    offset_ok = (chars[20] == ord(' ')) & ((chars[21] == ord('+')) | (chars[21] == ord('-')))
+    for position in (22, 23, 24, 25):
+        offset_ok &= (digits[position] >= 0) & (digits[position] <= 9)
+    valid &= ~has_offset | offset_ok
+    offset = (digits[22] * 10 + digits[23]) * 3600 + (digits[24] * 10 + digits[25]) * 60
+    offset = np.where(has_offset, np.where(chars[21] == ord('-'), -offset, offset), _LOCAL_OFFSET_SECONDS)
+
+    epochs[:] = days * 86400 + hour * 3600 + minute * 60 + second - offset
+
+    # Rare format variants: same strptime-based fallback as the per-line path
+    for i in np.flatnonzero(~valid).tolist():
+        dt_str = dt_strs[i]
+        if isinstance(dt_str, bytes):
+            dt_str = dt_str.decode('utf-8', errors='ignore')
+        timestamp_utc = parse_datetime_to_utc(dt_str)
+        if timestamp_utc is not None:
+            epochs[i] = int(timestamp_utc.timestamp())
+            valid[i] = True
+    return epochs, valid
+
+def parse_ts(dt_str):
+    """
+    Parses a 'dd/Mon/YYYY:HH:MM:SS [+zzzz]' timestamp without strptime.
+
+    Args:
+        dt_str (str): Timestamp as found in the log line (offset optional; local time if absent).
+
+    Returns:
+        datetime: Timezone-aware UTC datetime, or None if the string does not match.
+    """
+    epoch = parse_epoch(dt_str)
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc)
 
 def parse_datetime_to_utc(dt_str):
     """Parses log datetime string and returns timezone-aware UTC datetime or None."""
+    # Fast path for the standard format; strptime below handles any variants
+    dt_utc = parse_ts(dt_str)
+    if dt_utc is not None:
+        return dt_utc
     try:
         # Try parsing with timezone offset first
         dt_aware = datetime.strptime(dt_str, '%d/%b/%Y:%H:%M:%S %z')
@@ -66,114 +274,491 @@ def parse_datetime_to_utc(dt_str):
             dt_aware_local = dt_naive.astimezone()
             return dt_aware_local.astimezone(timezone.utc)
         except ValueError:
-            logger.warning(f"Skipping line due to malformed date: {dt_str}")
+            logger.warning("Skipping line due to malformed date: %s", dt_str)
             return None
 
-def load_log_into_dataframe(log_file, start_date_utc=None, whitelist=None):
+# Reader thread pipeline: batches of lines queued ahead of the parser
+_PIPELINE_DEPTH = 8 # Max byte blocks waiting in the queue
+_LINE_BATCH_BYTES = 1 << 20 # Forward reads: ~1 MiB blocks of whole lines
+_END_OF_INPUT = object() # Queue sentinel
+
+def _read_line_batches(filename, start_offset=0, end_offset=None):
     """
-    Reads a log file, parses relevant fields, filters by date and whitelist,
-    and returns a Pandas DataFrame.
+    Yield undecoded blocks of whole lines read forwards, about _LINE_BATCH_BYTES each.
+
+    Only lines starting within [start_offset, end_offset) are read (to the end of the
+    file if end_offset is None). A line straddling start_offset belongs to the previous
+    range, so the first partial line is skipped by realigning on the next newline.
+    """
+    with open(filename, 'rb') as f:
+        if start_offset > 0:
+            f.seek(start_offset - 1)
+            f.readline() # Realign to the first line starting at or after start_offset
+        position = f.tell()
+        while end_offset is None or position < end_offset:
+            size = _LINE_BATCH_BYTES if end_offset is None else min(_LINE_BATCH_BYTES, end_offset - position)
+            block = f.read(size)
+            if not block:
+                break
+            if not block.endswith(b'\n'):
+                block += f.readline() # Complete the last line, it started within the range
+            position += len(block)
+            yield block
+
+def _prefetch_batches(batches, depth=_PIPELINE_DEPTH):
+    """
+    Iterate 'batches' in a background reader thread and yield them.
+
+    The reader stays up to 'depth' blocks ahead through a bounded queue, so file reads
+    overlap with parsing in the caller. Closing the returned generator stops the
+    reader thread.
 
     Args:
-        log_file (str): Path to the log file.
-        start_date_utc (datetime, optional): Aware UTC datetime. Only entries >= this date are kept.
-        whitelist (list, optional): List of IPs/subnets to exclude.
+        batches (iterable): Undecoded byte blocks of whole lines (from _read_line_batches);
+                            consumed only by the reader thread.
+        depth (int): Queue size.
+
+    Yields:
+        bytes: Blocks in the order produced by 'batches'.
+    """
+    batch_queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up if the consumer went away instead of blocking on a full queue forever
+        while not stop.is_set():
+            try:
+                batch_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        try:
+            for batch in batches:
+                if not put(batch):
+                    return
+            put(_END_OF_INPUT)
+        except Exception as e: # Re-raised in the consumer
+            put(e)
+
+    thread = threading.Thread(target=reader, name='botstats-log-reader', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = batch_queue.get()
+            if item is _END_OF_INPUT:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+# Lines probed past an unparseable line before a bisection probe gives up
+_BISECT_MAX_SKIP_LINES = 100
+# Evenly spaced probes used to check that the file is time-ordered before bisecting
+_BISECT_ORDER_SAMPLES = 32
+
+def _line_start_at(mm, position):
+    """Offset of the first line starting at or after 'position' (len(mm) if none)."""
+    if position <= 0:
+        return 0
+    newline = mm.find(b'\n', position - 1)
+    return len(mm) if newline == -1 else newline + 1
+
+def _first_epoch_at(mm, position, max_lines=_BISECT_MAX_SKIP_LINES):
+    """
+    Epoch seconds of the first parseable line starting at or after 'position'.
+
+    Returns None at end of file, or if max_lines lines in a row
+    have no parseable '[timestamp]' field.
+    """
+    size = len(mm)
+    line_start = _line_start_at(mm, position)
+    for _ in range(max_lines):
+        if line_start >= size:
+            return None
+        line_end = mm.find(b'\n', line_start)
+        if line_end == -1:
+            line_end = size
+        open_bracket = mm.find(b'[', line_start, line_end)
+        if open_bracket != -1:
+            close_bracket = mm.find(b']', open_bracket, line_end)
+            if close_bracket != -1:
+                epoch = parse_epoch(mm[open_bracket + 1:close_bracket].decode('ascii', errors='replace'))
+                if epoch is not None:
+                    return epoch
+        line_start = line_end + 1
+    return None
+
+def _is_time_ordered(mm, samples=_BISECT_ORDER_SAMPLES):
+    """True if the timestamps sampled at evenly spaced offsets of 'mm' never decrease."""
+    size = len(mm)
+    epochs = [_first_epoch_at(mm, size * i // samples) for i in range(samples)]
+    epochs = [epoch for epoch in epochs if epoch is not None]
+    return all(earlier <= later for earlier, later in zip(epochs, epochs[1:]))
+
+def _find_start_offset(filename, start_date_utc):
+    """
+    Binary-searches a time-ordered log for the first line at or after start_date_utc.
+
+    Each probe jumps to a byte offset of the memory-mapped file, moves to the next line
+    start and parses only that line's timestamp, so locating the offset costs about
+    log2(file size) short reads regardless of how much of the file is older.
+    A few evenly spaced probes first check that the file is time-ordered, and the
+    line found is checked against its predecessor.
+
+    Args:
+        filename (str): Path to the log file.
+        start_date_utc (datetime): Aware UTC datetime.
 
     Returns:
-        pd.DataFrame: DataFrame with columns ['ip', 'timestamp'] or None if error.
-                      'timestamp' column contains timezone-aware UTC datetime objects.
+        int or None: Byte offset of the first line to read (a line start; file size if none),
+                     or None if the timestamps are not in order and bisection cannot be used.
+    """
+    start_epoch = math.ceil(start_date_utc.timestamp())
+    with open(filename, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if not _is_time_ordered(mm):
+                return None
+            # Smallest position whose next timestamped line is not older than the start.
+            # Probes that find no timestamp count as 'not older', which only widens the tail.
+            low, high = 0, size
+            while low < high:
+                mid = (low + high) // 2
+                epoch = _first_epoch_at(mm, mid)
+                if epoch is None or epoch >= start_epoch:
+                    high = mid
+                else:
+                    low = mid + 1
+            start_offset = _line_start_at(mm, low)
+            # The boundary must separate older lines from newer ones
+            if start_offset > 0:
+                previous_epoch = _first_epoch_at(mm, mm.rfind(b'\n', 0, start_offset - 1) + 1, max_lines=1)
+                if previous_epoch is not None and previous_epoch >= start_epoch:
+                    return None
+            return start_offset
+
+class _DecodedIPs(dict):
+    """Maps raw IP bytes to their decoded str, decoding each distinct IP once."""
+
+    def __missing__(self, raw_ip):
+        ip = self[raw_ip] = raw_ip.decode('utf-8', errors='ignore')
+        return ip
+
+class _FirstSeenIndex(dict):
+    """Maps each distinct key to its first-seen position (0, 1, 2, ...), in key order."""
+
+    def __missing__(self, key):
+        index = self[key] = len(self)
+        return index
+
+def _whitelist_checker(whitelist):
+    """Returns a callable ip -> bool for the whitelist, or None if it is empty."""
+    if not whitelist:
+        return None # Nothing to check
+    if isinstance(whitelist, CompiledWhitelist):
+        return whitelist.__contains__
+    return lambda ip: is_ip_in_whitelist(ip, whitelist)
+
+
+def _parse_batches(batches, start_date_utc=None, whitelist=None, log_progress=True):
+    """
+    Parses blocks of log lines read forwards, applying the whitelist and date filters.
+
+    Each block is scanned undecoded with a single BUFFER_LOG_PATTERN.findall, so the
+    regex engine walks the buffer in C and only (ip, datetime) bytes pairs are created;
+    there is no per-line Python work unless a whitelist is set (one check per distinct
+    IP of a block). Only the distinct IPs are decoded. Timestamps repeat heavily (one
+    value per second of traffic), so each entry keeps only the index of its distinct raw
+    timestamp and the distinct values are parsed once, at the end, with parse_epochs.
+
+    Args:
+        batches (iterable): Blocks of whole log lines (bytes, newline-terminated except possibly the last line of the file).
+        start_date_utc (datetime, optional): Aware UTC datetime. Older entries are skipped.
+        whitelist (list or CompiledWhitelist, optional): IPs/subnets to exclude.
+        log_progress (bool): Log a progress message every 50000 lines.
+
+    Returns:
+        tuple: (ips, timestamps, stats) where timestamps is an int64 array of epoch seconds
+               (UTC) and stats holds the line/skip counters.
     """
-    parsed_data = []
+    ips = []
+    dt_codes = [] # Per entry: index of its raw timestamp among the distinct ones
     total_lines = 0
-    skipped_date = 0
     skipped_whitelist = 0
     skipped_parsing = 0
+    findall = BUFFER_LOG_PATTERN.findall
+    in_whitelist = _whitelist_checker(whitelist)
+    get_ip, get_dt = itemgetter(0), itemgetter(1)
+    # Decoded IP per distinct raw IP: repeated IPs (bursts from one client) share one str
+    # object, so it is decoded and hashed once and later hashing/pickling sees the same object
+    decoded_ip = _DecodedIPs().__getitem__
+    distinct_dts = _FirstSeenIndex() # Distinct raw timestamps, parsed in one batch after reading
+    dt_code = distinct_dts.__getitem__
 
-    log_source = None
-    reading_mode = ""
+    for batch in batches:
+        batch_lines = batch.count(b'\n') + (not batch.endswith(b'\n'))
+        total_lines += batch_lines
+        matches = findall(batch)
+        skipped_parsing += batch_lines - len(matches)
+
+        ip_strs = list(map(decoded_ip, map(get_ip, matches)))
+        dt_raw = list(map(get_dt, matches))
+
+        # 1. Whitelist Check, once per distinct IP of the batch
+        if in_whitelist is not None and ip_strs:
+            listed = {ip for ip in set(ip_strs) if in_whitelist(ip)}
+            if listed:
+                kept = [ip not in listed for ip in ip_strs]
+                ip_strs = list(compress(ip_strs, kept))
+                dt_raw = list(compress(dt_raw, kept))
+                skipped_whitelist += len(kept) - len(ip_strs)
+
+        ips.extend(ip_strs)
+        dt_codes.extend(map(dt_code, dt_raw))
+
+        # Log progress periodically
+        if log_progress and total_lines // 50000 > (total_lines - batch_lines) // 50000:
+             logger.info("Processed %s lines...", total_lines)
+
+    # 2. Date Parsing and Filtering
+    distinct_epochs, distinct_parsed = parse_epochs(list(distinct_dts))
+    dt_codes = np.array(dt_codes, dtype=np.intp)
+    timestamps, keep = distinct_epochs[dt_codes], distinct_parsed[dt_codes]
+    skipped_date = len(keep) - int(np.count_nonzero(keep))
+    if start_date_utc:
+        # An integer timestamp is older than start_date_utc exactly when it is below
+        # the start rounded up to the next whole second
+        older = keep & (timestamps < math.ceil(start_date_utc.timestamp()))
+        skipped_date += int(np.count_nonzero(older))
+        keep &= ~older
+    if not keep.all():
+        ips = [ip for ip, kept in zip(ips, keep.tolist()) if kept]
+        timestamps = timestamps[keep]
+
+    stats = {
+        'total_lines': total_lines,
+        'skipped_parsing': skipped_parsing,
+        'skipped_date': skipped_date,
+        'skipped_whitelist': skipped_whitelist,
+    }
+    return ips, timestamps, stats
+
+
+def _parse_lines(lines, start_date_utc=None, whitelist=None, log_progress=True):
+    """
+    Parses log lines read in reverse (newest first), applying the whitelist and date filters.
+
+    Lines are parsed one at a time so the scan can stop at the first entry older than
+    start_date_utc. Used as the fallback when the file is not time-ordered.
+
+    Args:
+        lines (iterable): Log lines (str), newest first.
+        start_date_utc (datetime, optional): Aware UTC datetime. The scan stops at the first older entry.
+        whitelist (list or CompiledWhitelist, optional): IPs/subnets to exclude.
+        log_progress (bool): Log a progress message every 50000 lines.
+
+    Returns:
+        tuple: (ips, timestamps, stats) where timestamps is an int64 array of epoch seconds
+               (UTC) and stats holds the line/skip counters.
+    """
+    ips = []
+    timestamps = []
+    # Compare in epoch seconds: an integer timestamp is older than start_date_utc
+    # exactly when it is below the start rounded up to the next whole second
+    start_epoch = math.ceil(start_date_utc.timestamp()) if start_date_utc else None
+    total_lines = 0
+    skipped_date = 0
+    skipped_whitelist = 0
+    skipped_parsing = 0
     first_line_processed_reverse = True # Flag for reverse mode debugging
 
-    try:
-        if start_date_utc:
-            reading_mode = "reverse"
-            logger.info(f"Processing log file in reverse, stopping before {start_date_utc}")
-            log_source = _read_lines_reverse(log_file)
-        else:
-            reading_mode = "forward"
-            logger.info("Processing log file forwards (oldest first)")
-            log_source = open(log_file, 'r', encoding='utf-8', errors='ignore')
+    # Bind globals and methods used per line to locals once
+    search = LOG_PATTERN.search
+    parse = parse_epoch
+    ips_append = ips.append
+    timestamps_append = timestamps.append
+    in_whitelist = _whitelist_checker(whitelist)
+    # One-slot cache of the whitelist verdict: consecutive lines often share an IP
+    last_ip = None
+    last_ip_whitelisted = False
+    # One-slot cache of the parsed timestamp (None for unparseable)
+    last_dt_str = None
+    last_epoch = None
 
-        for line in log_source:
-            total_lines += 1
-            match = LOG_PATTERN.search(line)
-            if not match:
-                skipped_parsing += 1
-                continue
+    for line in lines:
+        total_lines += 1
+        match = search(line)
+        if not match:
+            skipped_parsing += 1
+            continue
 
-            data = match.groupdict()
-            ip = data['ip']
-            dt_str = data['datetime'] # Get raw datetime string
+        ip, dt_str = match.group('ip', 'datetime') # Raw datetime string
 
-            # 1. Whitelist Check (early exit)
-            if is_ip_in_whitelist(ip, whitelist):
+        # 1. Whitelist Check (early exit)
+        if in_whitelist is not None:
+            if ip != last_ip:
+                last_ip = ip
+                last_ip_whitelisted = in_whitelist(ip)
+            if last_ip_whitelisted:
                 skipped_whitelist += 1
                 continue
 
-            # 2. Date Parsing and Filtering
-            timestamp_utc = parse_datetime_to_utc(dt_str) # Pass raw string
-            if timestamp_utc is None:
-                skipped_date += 1
-                continue
+        # 2. Date Parsing and Filtering (consecutive lines often share the same second)
+        if dt_str == last_dt_str:
+            timestamp_epoch = last_epoch
+        else:
+            timestamp_epoch = parse(dt_str)
+            if timestamp_epoch is None:
+                # Rare format variants go through the strptime-based parser
+                timestamp_utc = parse_datetime_to_utc(dt_str)
+                if timestamp_utc is not None:
+                    timestamp_epoch = int(timestamp_utc.timestamp())
+            last_dt_str, last_epoch = dt_str, timestamp_epoch
+        if timestamp_epoch is None:
+            skipped_date += 1
+            continue
+
+        # --- Add Debugging for reverse mode ---
+        if first_line_processed_reverse:
+            logger.debug("First line (reverse): Raw='%s', ParsedEpoch='%s', StartDateUTC='%s'", dt_str, timestamp_epoch, start_date_utc)
+            first_line_processed_reverse = False # Only log once
+        # --- End Debugging ---
 
-            # --- Add Debugging for reverse mode ---
-            if reading_mode == "reverse" and first_line_processed_reverse:
-                logger.debug(f"First line (reverse): Raw='{dt_str}', ParsedUTC='{timestamp_utc}', StartDateUTC='{start_date_utc}'")
-                first_line_processed_reverse = False # Only log once
+        # Stop reverse reading if timestamp is before start_date_utc
+        if start_epoch is not None and timestamp_epoch < start_epoch:
+            logger.info("Reached entry older than %s. Stopping reverse scan.", start_date_utc)
+            # --- Add Debugging ---
+            logger.debug("Stopping because ParsedEpoch (%s) < StartDateUTC (%s)", timestamp_epoch, start_date_utc)
             # --- End Debugging ---
+            break
 
-            # Stop reverse reading if timestamp is before start_date_utc
-            if start_date_utc and timestamp_utc < start_date_utc:
-                if reading_mode == "reverse":
-                    logger.info(f"Reached entry older than {start_date_utc}. Stopping reverse scan.")
-                    # --- Add Debugging ---
-                    logger.debug(f"Stopping because ParsedUTC ({timestamp_utc}) < StartDateUTC ({start_date_utc})")
-                    # --- End Debugging ---
-                    break
-                else: # Forward reading, just skip this line
-                    skipped_date += 1
-                    continue
+        # Append relevant data
+        ips_append(ip)
+        timestamps_append(timestamp_epoch)
+
+        # Log progress periodically
+        if log_progress and total_lines % 50000 == 0:
+             logger.info("Processed %s lines...", total_lines)
 
-            # Append relevant data
-            parsed_data.append({'ip': ip, 'timestamp': timestamp_utc})
+    stats = {
+        'total_lines': total_lines,
+        'skipped_parsing': skipped_parsing,
+        'skipped_date': skipped_date,
+        'skipped_whitelist': skipped_whitelist,
+    }
+    return ips, np.array(timestamps, dtype=np.int64), stats
 
-            # Log progress periodically
-            if total_lines % 50000 == 0:
-                 logger.info(f"Processed {total_lines} lines...")
 
-        logger.info(f"Finished reading log file. Total lines: {total_lines}")
-        logger.info(f"Entries added: {len(parsed_data)}, Skipped (Parsing): {skipped_parsing}, Skipped (Date): {skipped_date}, Skipped (Whitelist): {skipped_whitelist}")
+def _parse_log_chunk(log_file, start, end, start_date_utc=None, whitelist=None):
+    """Worker entry point: parses the lines starting within [start, end) of log_file."""
+    return _parse_batches(_read_line_batches(log_file, start, end), start_date_utc, whitelist, log_progress=False)
 
-        if not parsed_data:
+
+def _parse_log_file_parallel(log_file, start_date_utc, whitelist, jobs, start_offset=0):
+    """
+    Splits log_file from start_offset to the end into 'jobs' byte ranges aligned to line
+    boundaries, parses each range in a worker process and merges the partial results
+    in file order. start_offset must be a line start (0 or a _find_start_offset result).
+    """
+    file_size = os.stat(log_file).st_size
+    chunk_size = -(-(file_size - start_offset) // jobs) # Ceiling division
+    offsets = [(start, min(start + chunk_size, file_size)) for start in range(start_offset, file_size, chunk_size or 1)]
+    logger.info("Parsing log file in %s chunks using %s worker processes", len(offsets), jobs)
+
+    ips = []
+    timestamps = []
+    stats = Counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(_parse_log_chunk, log_file, start, end, start_date_utc, whitelist)
+            for start, end in offsets
+        ]
+        for future in futures: # Keep file order when merging
+            chunk_ips, chunk_timestamps, chunk_stats = future.result()
+            ips.extend(chunk_ips)
+            timestamps.append(chunk_timestamps)
+            stats.update(chunk_stats)
+    # No chunks when the located start offset is already the end of the file
+    return ips, np.concatenate(timestamps) if timestamps else np.empty(0, dtype=np.int64), stats
+
+
+def load_log_into_dataframe(log_file, start_date_utc=None, whitelist=None, jobs=1):
+    """
+    Reads a log file, parses relevant fields, filters by date and whitelist,
+    and returns a Pandas DataFrame.
+
+    Args:
+        log_file (str): Path to the log file.
+        start_date_utc (datetime, optional): Aware UTC datetime. Only entries >= this date are kept.
+        whitelist (list or CompiledWhitelist, optional): IPs/subnets to exclude.
+        jobs (int, optional): Number of worker processes for parsing. With start_date_utc,
+                              only the tail located by binary search is split between them.
+
+    Returns:
+        pd.DataFrame: DataFrame with columns ['ip', 'timestamp'] or None if error.
+                      'ip' is categorical; 'timestamp' column contains timezone-aware UTC datetime objects.
+    """
+    log_source = None
+    whitelist = compile_whitelist(whitelist) # Parse whitelist entries once, not per line
+
+    try:
+        if start_date_utc:
+            start_offset = _find_start_offset(log_file, start_date_utc)
+            if start_offset is None:
+                # Out-of-order timestamps: scan from the end until the first older entry
+                logger.warning("Log timestamps are not in order; reading %s in reverse instead of bisecting.", log_file)
+                log_source = _read_lines_reverse(log_file)
+                ips, timestamps, stats = _parse_lines(log_source, start_date_utc, whitelist)
+            elif jobs and jobs > 1:
+                logger.info("Processing log file forwards from byte %s (first entry at or after %s)", start_offset, start_date_utc)
+                ips, timestamps, stats = _parse_log_file_parallel(log_file, start_date_utc, whitelist, jobs, start_offset)
+            else:
+                logger.info("Processing log file forwards from byte %s (first entry at or after %s)", start_offset, start_date_utc)
+                log_source = _prefetch_batches(_read_line_batches(log_file, start_offset))
+                ips, timestamps, stats = _parse_batches(log_source, start_date_utc, whitelist)
+        elif jobs and jobs > 1:
+            logger.info("Processing log file forwards (oldest first) in parallel")
+            ips, timestamps, stats = _parse_log_file_parallel(log_file, start_date_utc, whitelist, jobs)
+        else:
+            logger.info("Processing log file forwards (oldest first)")
+            log_source = _prefetch_batches(_read_line_batches(log_file))
+            ips, timestamps, stats = _parse_batches(log_source, start_date_utc, whitelist)
+
+        logger.info("Finished reading log file. Total lines: %s", stats['total_lines'])
+        logger.info("Entries added: %s, Skipped (Parsing): %s, Skipped (Date): %s, Skipped (Whitelist): %s", len(ips), stats['skipped_parsing'], stats['skipped_date'], stats['skipped_whitelist'])
+
+        if not ips:
             logger.warning("No valid log entries found after filtering.")
             return pd.DataFrame(columns=['ip', 'timestamp']) # Return empty DataFrame
 
         # Create DataFrame
-        df = pd.DataFrame(parsed_data)
-        # Ensure timestamp column is datetime type
-        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
-        logger.info(f"DataFrame created with {len(df)} entries.")
+        # Epoch seconds are converted to datetime64 in one vectorized call.
+        # IPs are stored once per distinct address (categorical codes per request),
+        # so per-IP work such as subnet mapping runs over the distinct IPs only
+        df = pd.DataFrame({
+            'ip': pd.Categorical(ips),
+            'timestamp': pd.to_datetime(timestamps, unit='s', utc=True),
+        })
+        logger.info("DataFrame created with %s entries.", len(df))
 
         return df
 
     except FileNotFoundError:
-        logger.error(f"File not found {log_file}")
+        logger.error("File not found %s", log_file)
         return None
     except Exception as e:
-        logger.error(f"Error processing log file {log_file}: {e}", exc_info=True)
+        logger.error("Error processing log file %s: %s", log_file, e, exc_info=True)
         return None
     finally:
-        # Only close if it's a file object (not a generator) and it's open
-        if log_source and hasattr(log_source, 'close') and callable(log_source.close) and not getattr(log_source, 'closed', True):
+        # Closing the line generator also stops its reader thread
+        if log_source is not None:
             log_source.close()
 
 
@@ -198,16 +783,94 @@ def get_subnet(ip_str):
         return ipaddress.ip_network(f"{ip_str}/{mask}", strict=False)
     except ValueError:
         # Logged internally by ipaddress usually, or we can add:
-        # logger.debug(f"Invalid IP address format for subnet calculation: {ip_str}")
+        # logger.debug("Invalid IP address format for subnet calculation: %s", ip_str)
         return None
 
 
+# Canonical dotted-quad IPv4 address (no leading zeros, as ipaddress requires)
+_IPV4_OCTET = r'(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])'
+_IPV4_RE = re.compile(r'(%s\.%s\.%s)\.%s' % (_IPV4_OCTET, _IPV4_OCTET, _IPV4_OCTET, _IPV4_OCTET))
+
+def get_subnet_str(ip_str):
+    """
+    Returns the default subnet (/24 for IPv4, /64 for IPv6) as its canonical
+    string, or None if the IP is invalid. Same value as str(get_subnet(ip_str)),
+    but dotted-quad IPv4 addresses are handled without ipaddress objects.
+    """
+    match = _IPV4_RE.fullmatch(ip_str)
+    if match:
+        return match.group(1) + '.0/24'
+    subnet = get_subnet(ip_str)
+    return None if subnet is None else str(subnet)
+
+class CompiledWhitelist:
+    """
+    Whitelist precompiled for per-line lookups without ipaddress objects.
+
+    Entries are grouped by prefix length: for each length present, a frozenset holds
+    the network prefixes as integers (single IPs are /32 or /128 prefixes). A lookup
+    shifts the address once per distinct prefix length and probes that set, so its
+    cost depends on the number of distinct lengths (at most 33 / 129), not on the
+    number of entries. Invalid entries are ignored.
+    """
+
+    def __init__(self, entries):
+        v4_prefixes, v6_prefixes = defaultdict(set), defaultdict(set)
+        for item in entries or []:
+            try:
+                network = ipaddress.ip_network(item, strict=False)
+            except ValueError:
+                continue # Ignore invalid whitelist entries
+            prefixes, bits = (v4_prefixes, 32) if network.version == 4 else (v6_prefixes, 128)
+            shift = bits - network.prefixlen
+            prefixes[shift].add(int(network.network_address) >> shift)
+        # (shift, prefixes) pairs, most specific first
+        self.v4_prefixes = tuple((shift, frozenset(v4_prefixes[shift])) for shift in sorted(v4_prefixes))
+        self.v6_prefixes = tuple((shift, frozenset(v6_prefixes[shift])) for shift in sorted(v6_prefixes))
+        self.size = sum(len(prefixes) for _, prefixes in self.v4_prefixes + self.v6_prefixes)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, ip):
+        try:
+            if ':' in ip:
+                ip_int = int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+                prefixes_by_shift = self.v6_prefixes
+            else:
+                ip_int = int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+                prefixes_by_shift = self.v4_prefixes
+        except (OSError, ValueError):
+            return False # Ignore invalid IP to check
+        for shift, prefixes in prefixes_by_shift:
+            if (ip_int >> shift) in prefixes:
+                return True
+        return False
+
+
+def compile_whitelist(whitelist):
+    """
+    Returns a CompiledWhitelist for a list of IP/subnet strings (unchanged if already compiled).
+
+    Args:
+        whitelist (list or CompiledWhitelist): IPs/subnets to exclude, or None.
+
+    Returns:
+        CompiledWhitelist: Compiled lookup structure (empty if whitelist is None).
+    """
+    if isinstance(whitelist, CompiledWhitelist):
+        return whitelist
+    return CompiledWhitelist(whitelist)
+
+
 def is_ip_in_whitelist(ip, whitelist):
     """
     Verifies if an IP is in the whitelist. Handles IPs and Subnets.
+    Accepts a CompiledWhitelist (fast path) or a plain list of entries.
     """
-    # ... (Implementation of is_ip_in_whitelist - unchanged) ...
     if not whitelist: return False
+    if isinstance(whitelist, CompiledWhitelist):
+        return ip in whitelist
     try:
         ip_obj = ipaddress.ip_address(ip)
         for item in whitelist:
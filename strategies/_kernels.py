@@ -0,0 +1,122 @@
+"""
+Numeric scoring kernels shared by the scorers the strategies build in compile().
+
+Each kernel takes plain NumPy columns and thresholds and returns NumPy arrays.
+When Numba is installed the kernels are compiled (parallel loop over threats);
+otherwise the pure-NumPy versions with identical results are used.
+Reason strings are built by the strategies themselves from the returned masks.
+"""
+import numpy as np
+
+# Optional JIT compilation, handle potential ImportError
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _volume_coordination_numpy(total_requests, ip_count, max_total_requests, max_ip_count,
+                               min_requests, min_ip_count):
+    """NumPy version of volume_coordination_kernel."""
+    n = len(total_requests)
+    normalized_ip_count = ip_count / max_ip_count if max_ip_count > 0 else np.zeros(n)
+    normalized_requests = total_requests / max_total_requests if max_total_requests > 0 else np.zeros(n)
+    scores = np.clip((normalized_ip_count * 0.7) + (normalized_requests * 0.3), 0.0, 1.0)
+    # Request threshold first: the IP count is only checked for candidates
+    should_block = total_requests >= min_requests
+    candidates = np.flatnonzero(should_block)
+    should_block[candidates] = ip_count[candidates] >= min_ip_count
+    return scores, should_block
+
+
+def _combined_numpy(time_span, total_requests, req_per_min_window,
+                    timespan_enabled, min_timespan_seconds, min_requests, min_req_per_min_window):
+    """NumPy version of combined_kernel."""
+    if timespan_enabled:
+        timespan_ok = time_span >= min_timespan_seconds
+    else:
+        timespan_ok = np.zeros(len(time_span), dtype=np.bool_)
+    total_req_ok = total_requests >= min_requests
+    req_min_win_ok = req_per_min_window > min_req_per_min_window
+    conditions_met = timespan_ok.astype(np.int64) + total_req_ok.astype(np.int64) + req_min_win_ok.astype(np.int64)
+    return timespan_ok, total_req_ok, req_min_win_ok, conditions_met
+
+
+if numba is not None:
+    # No fastmath: scores must match the NumPy path bit for bit so ranking ties are stable
+    @numba.njit(parallel=True, cache=True)
+    def _volume_coordination_numba(total_requests, ip_count, max_total_requests, max_ip_count,
+                                   min_requests, min_ip_count):
+        n = len(total_requests)
+        scores = np.empty(n, dtype=np.float64)
+        should_block = np.empty(n, dtype=np.bool_)
+        for i in numba.prange(n):
+            normalized_ip_count = ip_count[i] / max_ip_count if max_ip_count > 0 else 0.0
+            normalized_requests = total_requests[i] / max_total_requests if max_total_requests > 0 else 0.0
+            score = (normalized_ip_count * 0.7) + (normalized_requests * 0.3)
+            scores[i] = min(max(score, 0.0), 1.0)
+            # Request threshold first: the IP count is only checked for candidates
+            should_block[i] = total_requests[i] >= min_requests and ip_count[i] >= min_ip_count
+        return scores, should_block
+
+    @numba.njit(parallel=True, cache=True)
+    def _combined_numba(time_span, total_requests, req_per_min_window,
+                        timespan_enabled, min_timespan_seconds, min_requests, min_req_per_min_window):
+        n = len(time_span)
+        timespan_ok = np.empty(n, dtype=np.bool_)
+        total_req_ok = np.empty(n, dtype=np.bool_)
+        req_min_win_ok = np.empty(n, dtype=np.bool_)
+        conditions_met = np.empty(n, dtype=np.int64)
+        for i in numba.prange(n):
+            timespan_ok[i] = timespan_enabled and time_span[i] >= min_timespan_seconds
+            total_req_ok[i] = total_requests[i] >= min_requests
+            req_min_win_ok[i] = req_per_min_window[i] > min_req_per_min_window
+            conditions_met[i] = np.int64(timespan_ok[i]) + np.int64(total_req_ok[i]) + np.int64(req_min_win_ok[i])
+        return timespan_ok, total_req_ok, req_min_win_ok, conditions_met
+
+    _volume_coordination_impl = _volume_coordination_numba
+    _combined_impl = _combined_numba
+else:
+    _volume_coordination_impl = _volume_coordination_numpy
+    _combined_impl = _combined_numpy
+
+
+def volume_coordination_kernel(total_requests, ip_count, max_total_requests, max_ip_count,
+                               min_requests, min_ip_count):
+    """
+    Normalized volume/coordination score and block mask.
+
+    Args:
+        total_requests (np.ndarray): int64 requests per threat.
+        ip_count (np.ndarray): int64 unique IPs per threat.
+        max_total_requests (float): Maximum total_requests over all threats (<= 0 disables that term).
+        max_ip_count (float): Maximum ip_count over all threats (<= 0 disables that term).
+        min_requests (float): Effective minimum request threshold.
+        min_ip_count (float): Minimum unique IP threshold.
+
+    Returns:
+        tuple: (scores float64 array in [0, 1], should_block bool array)
+    """
+    return _volume_coordination_impl(total_requests, ip_count, float(max_total_requests), float(max_ip_count),
+                                     float(min_requests), float(min_ip_count))
+
+
+def combined_kernel(time_span, total_requests, req_per_min_window,
+                    timespan_enabled, min_timespan_seconds, min_requests, min_req_per_min_window):
+    """
+    Evaluates the three conditions of the combined strategy.
+
+    Args:
+        time_span (np.ndarray): float64 subnet activity timespan in seconds.
+        total_requests (np.ndarray): int64 requests per threat.
+        req_per_min_window (np.ndarray): float64 Req/Min over the analysis window.
+        timespan_enabled (bool): False when the analysis duration is unknown (condition 1 never met).
+        min_timespan_seconds (float): Timespan threshold in seconds.
+        min_requests (float): Effective minimum request threshold.
+        min_req_per_min_window (float): Req/Min(Win) threshold (strictly greater than).
+
+    Returns:
+        tuple: (timespan_ok, total_req_ok, req_min_win_ok, conditions_met) arrays.
+    """
+    return _combined_impl(time_span, total_requests, req_per_min_window, bool(timespan_enabled),
+                          float(min_timespan_seconds), float(min_requests), float(min_req_per_min_window))
@@ -2,6 +2,8 @@
 Base class or interface definition for blocking strategies.
 """
 from abc import ABC, abstractmethod
+from types import SimpleNamespace
+import numpy as np
 
 class BaseStrategy(ABC):
     """Abstract base class for threat scoring and blocking strategies."""
@@ -34,6 +36,57 @@ class BaseStrategy(ABC):
         """
         pass
 
+    def compile(self,
+                config,
+                effective_min_requests,
+                shared_context_params):
+        """
+        Builds a scorer specialized to one run's thresholds and context.
+
+        Strategies should override this, resolving config values, thresholds and fixed
+        reason texts once and returning a closure with vectorized column operations.
+        The default scorer falls back to calling calculate_threat_score_and_block per row.
+
+        Args:
+            config, effective_min_requests, shared_context_params: As in calculate_threat_score_and_block.
+
+        Returns:
+            callable: scorer(metrics_df) -> (scores, should_block, reasons) NumPy arrays aligned
+                      with metrics_df rows (one row per threat/subnet, indexed by subnet object,
+                      with the same metric columns passed in threat_data).
+        """
+        def scorer(metrics_df):
+            n = len(metrics_df)
+            scores = np.zeros(n, dtype=float)
+            should_block = np.zeros(n, dtype=bool)
+            reasons = np.empty(n, dtype=object)
+            for i, (subnet_obj, metrics_row) in enumerate(metrics_df.iterrows()):
+                threat_data = metrics_row.to_dict()
+                threat_data['id'] = subnet_obj
+                scores[i], should_block[i], reasons[i] = self.calculate_threat_score_and_block(
+                    threat_data=threat_data,
+                    config=config,
+                    effective_min_requests=effective_min_requests,
+                    shared_context_params=shared_context_params
+                )
+            return scores, should_block, reasons
+
+        return scorer
+
+    def snapshot_config(self, config):
+        """
+        Copies the options listed by get_required_config_keys out of the full config.
+
+        Args:
+            config (argparse.Namespace): Parsed command-line arguments.
+
+        Returns:
+            SimpleNamespace: Only the keys this strategy reads, as plain attributes.
+        """
+        return SimpleNamespace(**{key: getattr(config, key)
+                                  for key in self.get_required_config_keys()
+                                  if hasattr(config, key)})
+
     def get_required_config_keys(self):
         """
         Returns a list of config keys (argparse args) expected by this strategy.
@@ -11,7 +11,10 @@ Blocking occurs if the score is >= 2.0.
 """
 
 import logging
+import numpy as np
 import pandas as pd # Import pandas for isna check
+from .base_strategy import BaseStrategy
+from ._kernels import combined_kernel
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +23,7 @@ logger = logging.getLogger(__name__)
 # --- Threshold for blocking based on score (conditions met) ---
 BLOCKING_SCORE_THRESHOLD = 2.0
 
-class Strategy:
+class Strategy(BaseStrategy):
     """
     Combined strategy (Updated Logic 8 - Configurable TimeSpan):
     - Score reflects how many blocking conditions are met (0-3):
@@ -139,3 +142,87 @@ class Strategy:
 
         # Return the score (0.0-3.0) and the block decision/reason
         return score, should_block, reason
+
+    def compile(self,
+                config,
+                effective_min_requests,
+                shared_context_params):
+        """
+        Vectorized version of calculate_threat_score_and_block, specialized for one run.
+        Thresholds and the fixed reason texts are resolved once here; the returned
+        scorer evaluates the three conditions as boolean columns and builds the same
+        score and reason strings without a Python call per threat.
+        """
+        analysis_duration_seconds = shared_context_params.get('analysis_duration_seconds', 0)
+        min_timespan_percent = config.block_min_timespan_percent
+        min_total_req_threshold = effective_min_requests
+        min_req_win_threshold = config.block_total_max_rpm_threshold
+
+        timespan_enabled = bool(analysis_duration_seconds and analysis_duration_seconds > 0)
+        min_timespan_threshold_seconds = analysis_duration_seconds * (min_timespan_percent / 100.0) if timespan_enabled else 0.0
+
+        # Fixed reason fragments for this run
+        timespan_met_text = f"TimeSpan >= {min_timespan_percent:.1f}% ("
+        timespan_failed_text = f"TimeSpan < {min_timespan_percent:.1f}% ("
+        timespan_skipped_text = f"TimeSpan % condition skipped (duration={analysis_duration_seconds})"
+        total_req_met_suffix = f" >= {min_total_req_threshold})"
+        total_req_failed_suffix = f" < {min_total_req_threshold})"
+        req_min_win_met_text = f"Req/Min(Win) > {min_req_win_threshold:.1f}"
+        req_min_win_failed_text = f"Req/Min(Win) <= {min_req_win_threshold:.1f}"
+        block_text = f" >= {BLOCKING_SCORE_THRESHOLD:.1f}. Met ("
+        no_block_text = f" < {BLOCKING_SCORE_THRESHOLD:.1f}."
+        score_str_lookup = np.array(["0.0", "1.0", "2.0", "3.0"], dtype=object)
+
+        def scorer(metrics_df):
+            n = len(metrics_df)
+            current_timespan = metrics_df['subnet_time_span'].fillna(0).to_numpy(dtype=float)
+            current_total_req = metrics_df['total_requests'].fillna(0).to_numpy().astype(np.int64)
+            current_req_min_win = metrics_df['subnet_req_per_min_window'].fillna(0.0).to_numpy(dtype=float)
+
+            # --- Evaluate the three conditions in the shared kernel ---
+            timespan_condition_met, total_req_ok, req_min_win_ok, conditions_met_count = combined_kernel(
+                current_timespan, current_total_req, current_req_min_win,
+                timespan_enabled, min_timespan_threshold_seconds, min_total_req_threshold, min_req_win_threshold
+            )
+
+            # --- Condition 1: TimeSpan ---
+            if timespan_enabled:
+                timespan_str = np.round(current_timespan).astype(np.int64).astype(str).astype(object)
+                timespan_reasons = np.where(timespan_condition_met, timespan_met_text, timespan_failed_text).astype(object) + timespan_str + "s)"
+            else:
+                timespan_reasons = np.full(n, timespan_skipped_text, dtype=object)
+
+            # --- Condition 2: Total Requests vs effective_min_requests ---
+            total_req_str = current_total_req.astype(str).astype(object)
+            total_req_reasons = np.where(total_req_ok,
+                                         "TotalReq >= effective_min (" + total_req_str + total_req_met_suffix,
+                                         "TotalReq < effective_min (" + total_req_str + total_req_failed_suffix)
+
+            # --- Condition 3: Req/Min(Win) ---
+            req_min_win_reasons = np.where(req_min_win_ok, req_min_win_met_text, req_min_win_failed_text).astype(object)
+
+            # --- Final Block Decision and Score Calculation ---
+            scores = conditions_met_count.astype(float)
+            should_block = scores >= BLOCKING_SCORE_THRESHOLD
+
+            # Join met/failed condition texts per row (", "-separated, empty if none)
+            met_joined = np.full(n, "", dtype=object)
+            failed_joined = np.full(n, "", dtype=object)
+            for met, text in ((timespan_condition_met, timespan_reasons),
+                              (total_req_ok, total_req_reasons),
+                              (req_min_win_ok, req_min_win_reasons)):
+                met_joined = met_joined + np.where(met, text + ", ", "")
+                failed_joined = failed_joined + np.where(met, "", text + ", ")
+            met_joined = pd.Series(met_joined, dtype=object).str[:-2].to_numpy(dtype=object)
+            failed_joined = pd.Series(failed_joined, dtype=object).str[:-2].to_numpy(dtype=object)
+
+            score_str = score_str_lookup[conditions_met_count]
+            block_reasons = "Block: Score " + score_str + block_text + met_joined + ")"
+            no_block_reasons = ("No Block: Score " + score_str + no_block_text
+                                + np.where(met_joined != "", " Met (" + met_joined + ").", "")
+                                + np.where(failed_joined != "", " Failed (" + failed_joined + ").", ""))
+            reasons = np.where(should_block, block_reasons, no_block_reasons)
+
+            return scores, should_block, reasons
+
+        return scorer
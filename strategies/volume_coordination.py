@@ -5,7 +5,9 @@ Blocks if total requests exceed a threshold AND the number of unique IPs
 within the subnet exceeds another threshold.
 """
 import logging
+import numpy as np
 from .base_strategy import BaseStrategy
+from ._kernels import volume_coordination_kernel
 
 logger = logging.getLogger('botstats.strategy.volume_coordination')
 
@@ -55,11 +57,44 @@ class Strategy(BaseStrategy):
             should_block = True
             reason = (f"meets request threshold ({total_requests}>={min_req}) "
                       f"and IP count threshold ({ip_count}>={min_ip_count})")
-            logger.debug(f"Threat {threat_data.get('id', 'N/A')} qualifies: {reason}")
+            logger.debug("Threat %s qualifies: %s", threat_data.get('id', 'N/A'), reason)
         elif total_requests >= min_req:
-             logger.debug(f"Threat {threat_data.get('id', 'N/A')} meets request threshold ({total_requests}>={min_req}) but not IP count "
-                          f"({ip_count} < {min_ip_count})")
+             logger.debug("Threat %s meets request threshold (%s>=%s) but not IP count (%s < %s)",
+                          threat_data.get('id', 'N/A'), total_requests, min_req, ip_count, min_ip_count)
         else: # Log if below request threshold
-             logger.debug(f"Threat {threat_data.get('id', 'N/A')} below request threshold ({total_requests} < {min_req})")
+             logger.debug("Threat %s below request threshold (%s < %s)", threat_data.get('id', 'N/A'), total_requests, min_req)
 
         return score, should_block, reason
+
+    def compile(self,
+                config,
+                effective_min_requests,
+                shared_context_params):
+        """Vectorized normalized score and block decision, specialized for one run."""
+        max_ip_count = shared_context_params.get('max_ip_count', 0) or 0
+        max_total_requests = shared_context_params.get('max_total_requests', 0) or 0
+        min_req = effective_min_requests
+        min_ip_count = getattr(config, 'block_ip_count_threshold', 0)
+        # Fixed reason fragments for this run
+        request_text = f">={min_req}) and IP count threshold ("
+        ip_count_text = f">={min_ip_count})"
+
+        def scorer(metrics_df):
+            total_requests = metrics_df['total_requests'].fillna(0).to_numpy().astype(np.int64)
+            ip_count = metrics_df['ip_count'].fillna(0).to_numpy().astype(np.int64)
+
+            # Normalized score (0-1 range) and block mask from the shared kernel. Only subnets
+            # meeting the request threshold are checked for IP count and get reason strings.
+            scores, should_block = volume_coordination_kernel(
+                total_requests, ip_count, max_total_requests, max_ip_count, min_req, min_ip_count
+            )
+            blocking_idx = np.flatnonzero(should_block)
+            reasons = np.full(len(total_requests), None, dtype=object)
+            reasons[blocking_idx] = ("meets request threshold (" + total_requests[blocking_idx].astype(str).astype(object) + request_text
+                                     + ip_count[blocking_idx].astype(str).astype(object) + ip_count_text)
+            logger.debug("%s of %s threats qualify (requests>=%s and IP count>=%s).",
+                         len(blocking_idx), len(should_block), min_req, min_ip_count)
+
+            return scores, should_block, reasons
+
+        return scorer
@@ -12,13 +12,19 @@ import csv
 import os
 import pandas as pd
 import numpy as np
-from ipaddress import ip_network, IPv4Network, IPv6Network
+from ipaddress import ip_network
 import importlib # Needed for dynamic strategy loading
 import time # Ensure time is imported
 
+# Optional fast JSON serializer for export, handle potential ImportError
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Import from parser (Reverted)
 from parser import (
-    load_log_into_dataframe, get_subnet, is_ip_in_whitelist
+    load_log_into_dataframe, get_subnet_str, is_ip_in_whitelist
 )
 
 # Logger for this module
@@ -49,12 +55,14 @@ class ThreatAnalyzer:
 
         # Final output list (compatible with previous structure)
         self.unified_threats = []
+        self.threat_scores = np.empty(0) # strategy_score per unified_threats entry (same order)
+        self.threats_frame = None # Columnar copy of unified_threats, used for export
 
     def load_whitelist_from_file(self, whitelist_file):
         """Loads whitelist from file."""
         # ... (Implementation unchanged) ...
         if not os.path.exists(whitelist_file):
-            logger.error(f"Whitelist file not found: {whitelist_file}")
+            logger.error("Whitelist file not found: %s", whitelist_file)
             return 0
         loaded_count = 0
         try:
@@ -64,26 +72,27 @@ class ThreatAnalyzer:
                 if entry not in self.whitelist:
                     self.whitelist.append(entry)
                     loaded_count += 1
-            logger.info(f"{loaded_count} new entries loaded from {whitelist_file}. Whitelist now has {len(self.whitelist)} total entries.")
+            logger.info("%s new entries loaded from %s. Whitelist now has %s total entries.", loaded_count, whitelist_file, len(self.whitelist))
             return loaded_count
         except Exception as e:
-            logger.error(f"Error loading whitelist from {whitelist_file}: {e}")
+            logger.error("Error loading whitelist from %s: %s", whitelist_file, e)
             return 0
 
 
-    def analyze_log_file(self, log_file, start_date_utc=None):
+    def analyze_log_file(self, log_file, start_date_utc=None, jobs=1):
         """
         Loads log data into a Pandas DataFrame, applying date and whitelist filters.
 
         Args:
             log_file (str): Path to the log file.
             start_date_utc (datetime, optional): Aware UTC datetime filter.
+            jobs (int, optional): Number of worker processes used to parse the file.
 
         Returns:
             int: Number of entries loaded into the DataFrame, or -1 on error.
         """
         logger.info("Loading log data into DataFrame...")
-        self.log_df = load_log_into_dataframe(log_file, start_date_utc, self.whitelist)
+        self.log_df = load_log_into_dataframe(log_file, start_date_utc, self.whitelist, jobs=jobs)
 
         if self.log_df is None:
             logger.error("Failed to load log data.")
@@ -93,7 +102,7 @@ class ThreatAnalyzer:
             logger.warning("Log DataFrame is empty after loading and initial filtering.")
             return 0
 
-        logger.info(f"Successfully loaded {len(self.log_df)} log entries into DataFrame.")
+        logger.info("Successfully loaded %s log entries into DataFrame.", len(self.log_df))
         # Ensure timestamp is the index for resampling
         if 'timestamp' in self.log_df.columns:
              # Convert index to datetime if it's not already (might happen if loaded differently)
@@ -107,7 +116,7 @@ class ThreatAnalyzer:
 
         # Add subnet information directly to the main log DataFrame
         logger.debug("Adding subnet information to log DataFrame...")
-        self.log_df['subnet'] = self.log_df['ip'].map(get_subnet)
+        self.log_df['subnet'] = self.log_df['ip'].map(get_subnet_str)
         # Drop rows where subnet couldn't be determined (should be rare)
         self.log_df = self.log_df.dropna(subset=['subnet'])
         logger.debug("Subnet information added.")
@@ -139,36 +148,39 @@ class ThreatAnalyzer:
                      else:
                           raise ValueError("Conversion failed")
                  except Exception as e:
-                     logger.error(f"Failed to convert 'timestamp' column to datetime: {e}", exc_info=True)
+                     logger.error("Failed to convert 'timestamp' column to datetime: %s", e, exc_info=True)
                      return False
              else:
                  return False # Cannot proceed without timestamps
 
         logger.info("Calculating metrics per IP...")
 
+        # Per-IP counts and first/last seen are single unsorted passes (bincount, min/max);
+        # only the (IP, minute) keys for the RPM metrics are sorted, as one int64 array
+        ts_index = pd.DatetimeIndex(ts_col)
+        ts_ns = ts_index.asi8 # int64 ns since epoch (UTC)
+        ip_codes, ip_uniques = pd.factorize(self.log_df['ip'].to_numpy(), sort=True) # Sorted like groupby('ip')
+        n_ips = len(ip_uniques)
+
         # 1. Basic Aggregations (Total Requests, First/Last Seen, Time Span)
         logger.debug("Calculating total requests, first/last seen, time span per IP...")
         try:
-            # Group by IP and aggregate directly
-            # Use the identified timestamp source (ts_col might be index or column)
-            # If ts_col is the index, we need to aggregate based on it.
-            # If ts_col is a column, we aggregate based on it.
-            # Let's ensure 'timestamp' column exists for simplicity here.
-            if isinstance(ts_col, pd.Index):
-                 # If timestamp is index, temporarily reset it for consistent aggregation
-                 temp_df = self.log_df.reset_index()
-                 ts_col_name = temp_df.columns[0] # Get the name of the reset index column
-            else:
-                 temp_df = self.log_df
-                 ts_col_name = 'timestamp'
-
-            basic_agg = temp_df.groupby('ip').agg(
-                total_requests=('ip', 'count'),
-                first_seen=(ts_col_name, 'min'),
-                last_seen=(ts_col_name, 'max')
-            )
-            # Calculate time span directly on the aggregated result
-            basic_agg['time_span_seconds'] = (basic_agg['last_seen'] - basic_agg['first_seen']).dt.total_seconds().fillna(0).clip(lower=0)
+            first_ns = np.full(n_ips, np.iinfo(np.int64).max, dtype=np.int64)
+            last_ns = np.full(n_ips, np.iinfo(np.int64).min, dtype=np.int64)
+            np.minimum.at(first_ns, ip_codes, ts_ns)
+            np.maximum.at(last_ns, ip_codes, ts_ns)
+
+            def _to_datetimes(ns_values):
+                # Back to datetimes in the source timezone (tz_convert(None) keeps naive input naive)
+                return pd.DatetimeIndex(ns_values.view('M8[ns]')).tz_localize('UTC').tz_convert(ts_index.tz)
+
+            basic_agg = pd.DataFrame({
+                'total_requests': np.bincount(ip_codes, minlength=n_ips),
+                'first_seen': _to_datetimes(first_ns),
+                'last_seen': _to_datetimes(last_ns),
+            }, index=pd.Index(ip_uniques, name='ip'))
+            # Time span in seconds straight from the int64 nanosecond values
+            basic_agg['time_span_seconds'] = np.clip((last_ns - first_ns) / 1e9, 0, None)
 
             # Calculate Requests per Hour (using analysis window duration)
             if analysis_duration_seconds and analysis_duration_seconds > 0:
@@ -180,53 +192,46 @@ class ThreatAnalyzer:
 
 
         except Exception as e:
-             logger.error(f"Error during basic IP aggregation: {e}", exc_info=True)
+             logger.error("Error during basic IP aggregation: %s", e, exc_info=True)
              return False
-        logger.debug(f"Calculated basic aggregations for {len(basic_agg)} IPs.")
+        logger.debug("Calculated basic aggregations for %s IPs.", len(basic_agg))
 
 
         # 2. RPM Metrics (Average and Max during active minutes)
         logger.debug("Calculating RPM metrics (avg/max during activity)...")
-        rpm_metrics = pd.DataFrame(index=basic_agg.index, columns=['avg_rpm_activity', 'max_rpm_activity']).fillna(0.0) # Initialize with correct index and default float
+        rpm_metrics = pd.DataFrame(0.0, index=basic_agg.index, columns=['avg_rpm_activity', 'max_rpm_activity'])
         try:
-            # Ensure log_df has datetime index for resampling
-            if not isinstance(self.log_df.index, pd.DatetimeIndex):
-                 # If 'timestamp' column exists and is datetime, set it as index
-                 if 'timestamp' in self.log_df.columns and pd.api.types.is_datetime64_any_dtype(self.log_df['timestamp']):
-                     log_df_indexed = self.log_df.set_index('timestamp')
-                     if not isinstance(log_df_indexed.index, pd.DatetimeIndex):
-                          raise ValueError("Index is not datetime after set_index.")
-                 else:
-                      # This case should have been caught earlier, but double-check
-                      raise ValueError("Cannot create datetime index for RPM calculation.")
+            # Requests per (IP, minute bucket): same bins as resample('T'), active minutes only
+            minutes = ts_ns // 60_000_000_000
+            first_minute = int(minutes.min())
+            minute_span = int(minutes.max()) - first_minute + 1
+            if n_ips * minute_span < 2**63:
+                # One combined key per request; sorting it groups runs by IP (code order), then minute
+                keys = np.sort(ip_codes.astype(np.int64) * minute_span + (minutes - first_minute))
+                run_starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+                run_codes = keys[run_starts] // minute_span
             else:
-                 log_df_indexed = self.log_df # Already has datetime index
-
-            # Resample per minute, count requests per IP, filter inactive minutes
-            # Use observed=True if pandas version >= 1.5 for potential performance improvement with categorical IPs
-            rpm_counts = log_df_indexed.groupby('ip', observed=True).resample('T').size()
-            rpm_counts = rpm_counts[rpm_counts > 0] # Keep only minutes with activity
-
-            if not rpm_counts.empty:
-                # Calculate avg and max RPM for IPs that had activity
-                # Group by the 'ip' level of the MultiIndex
-                grouped_rpm = rpm_counts.groupby(level='ip')
-                avg_rpm = grouped_rpm.mean()
-                max_rpm = grouped_rpm.max()
-
-                # Create DataFrame with results
-                rpm_metrics_calculated = pd.DataFrame({
-                    'avg_rpm_activity': avg_rpm,
-                    'max_rpm_activity': max_rpm
-                })
-                # Update the initialized rpm_metrics DataFrame, keeping IPs with no multi-minute activity at 0
-                rpm_metrics.update(rpm_metrics_calculated)
-                logger.debug(f"Calculated RPM metrics for {len(rpm_metrics_calculated)} IPs with multi-minute activity.")
+                # Key space too large for int64: sort by (IP, minute) pairs instead
+                order = np.lexsort((minutes, ip_codes))
+                codes_sorted = ip_codes[order]
+                minutes_sorted = minutes[order]
+                run_starts = np.flatnonzero(np.r_[True, (codes_sorted[1:] != codes_sorted[:-1])
+                                                        | (minutes_sorted[1:] != minutes_sorted[:-1])])
+                run_codes = codes_sorted[run_starts]
+            run_counts = np.diff(np.r_[run_starts, len(ts_ns)])
+
+            if len(run_counts):
+                # Runs are grouped by IP in code order, so per-IP reductions are reduceat/bincount
+                ip_run_starts = np.flatnonzero(np.r_[True, run_codes[1:] != run_codes[:-1]])
+                active_minutes = np.bincount(run_codes, minlength=len(ip_uniques))
+                rpm_metrics['avg_rpm_activity'] = np.bincount(run_codes, weights=run_counts, minlength=len(ip_uniques)) / active_minutes
+                rpm_metrics['max_rpm_activity'] = np.maximum.reduceat(run_counts, ip_run_starts).astype(float)
+                logger.debug("Calculated RPM metrics for %s IPs with multi-minute activity.", len(ip_run_starts))
             else:
                  logger.debug("No multi-minute activity found for RPM calculation.")
 
         except Exception as e:
-            logger.error(f"Error calculating RPM metrics: {e}", exc_info=True)
+            logger.error("Error calculating RPM metrics: %s", e, exc_info=True)
             # Continue with RPM metrics as 0, but log the error
 
         # 3. Combine Metrics
@@ -240,20 +245,20 @@ class ThreatAnalyzer:
         # 4. Add Subnet Information
         logger.debug("Adding subnet information...")
         try:
-            # Use the IP index to map to subnets
-            self.ip_metrics_df['subnet'] = self.ip_metrics_df.index.map(get_subnet)
+            # Use the IP index to map to subnets (canonical strings; objects are built per subnet later)
+            self.ip_metrics_df['subnet'] = self.ip_metrics_df.index.map(get_subnet_str)
             # Drop IPs where subnet couldn't be determined (e.g., invalid IP format somehow)
             rows_before_drop = len(self.ip_metrics_df)
             self.ip_metrics_df = self.ip_metrics_df.dropna(subset=['subnet'])
             rows_after_drop = len(self.ip_metrics_df)
             if rows_before_drop > rows_after_drop:
-                 logger.warning(f"Dropped {rows_before_drop - rows_after_drop} IPs due to missing subnet information.")
+                 logger.warning("Dropped %s IPs due to missing subnet information.", rows_before_drop - rows_after_drop)
             logger.debug("Subnet information added.")
         except Exception as e:
-             logger.error(f"Error adding subnet information to ip_metrics_df: {e}", exc_info=True)
+             logger.error("Error adding subnet information to ip_metrics_df: %s", e, exc_info=True)
              return False # Subnet info is crucial for aggregation
 
-        logger.info(f"Finished calculating metrics for {len(self.ip_metrics_df)} IPs.")
+        logger.info("Finished calculating metrics for %s IPs.", len(self.ip_metrics_df))
         return True
 
     def _calculate_subnet_rpm_metrics(self):
@@ -322,13 +327,17 @@ class ThreatAnalyzer:
             # Drop intermediate timestamp columns
             agg1 = agg1.drop(columns=['subnet_first_seen', 'subnet_last_seen'], errors='ignore')
 
-            # Ensure index is the correct type (ipaddress object)
-            agg1.index = agg1.index.map(lambda x: ip_network(x, strict=False) if not isinstance(x, (IPv4Network, IPv6Network)) else x)
+            # Subnets are grouped as canonical strings; ipaddress objects are only built here,
+            # once per subnet, and ordered by address (IPv4 before IPv6) as before
+            subnet_objs = [ip_network(subnet_str, strict=False) for subnet_str in agg1.index]
+            order = sorted(range(len(subnet_objs)), key=lambda i: (subnet_objs[i].version, int(subnet_objs[i].network_address)))
+            agg1 = agg1.iloc[order]
+            agg1.index = pd.Index([subnet_objs[i] for i in order], dtype=object, name=agg1.index.name)
 
-            logger.debug(f"Primary aggregation complete for {len(agg1)} subnets.")
+            logger.debug("Primary aggregation complete for %s subnets.", len(agg1))
 
         except Exception as e:
-            logger.error(f"Error during primary aggregation: {e}", exc_info=True)
+            logger.error("Error during primary aggregation: %s", e, exc_info=True)
             return False
 
         # --- 2. Calculate Subnet Total RPM metrics from log_df ---
@@ -350,10 +359,11 @@ class ThreatAnalyzer:
             numeric_cols = self.subnet_metrics_df.select_dtypes(include=np.number).columns
             self.subnet_metrics_df[numeric_cols] = self.subnet_metrics_df[numeric_cols].fillna(0)
 
-            logger.debug(f"Final combined subnet metrics (before type conversion):\n{self.subnet_metrics_df.head()}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Final combined subnet metrics (before type conversion):\n%s", self.subnet_metrics_df.head())
 
         except Exception as e:
-             logger.error(f"Error joining aggregated subnet metrics: {e}", exc_info=True)
+             logger.error("Error joining aggregated subnet metrics: %s", e, exc_info=True)
              return False
 
         # --- 4. Ensure correct data types ---
@@ -379,15 +389,16 @@ class ThreatAnalyzer:
                     else:
                          self.subnet_metrics_df[col] = self.subnet_metrics_df[col].astype(float)
                 else:
-                    logger.warning(f"Column '{col}' missing before type conversion. Adding as {dtype}(0).")
+                    logger.warning("Column '%s' missing before type conversion. Adding as %s(0).", col, dtype)
                     self.subnet_metrics_df[col] = dtype(0) # Add column with default value
 
         except Exception as e:
-             logger.error(f"Error converting data types for subnet metrics: {e}", exc_info=True)
+             logger.error("Error converting data types for subnet metrics: %s", e, exc_info=True)
              # Continue, but data types might be incorrect
 
-        logger.info(f"Finished aggregating metrics for {len(self.subnet_metrics_df)} subnets.")
-        logger.debug(f"Final combined subnet metrics (after type conversion):\n{self.subnet_metrics_df.head()}")
+        logger.info("Finished aggregating metrics for %s subnets.", len(self.subnet_metrics_df))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Final combined subnet metrics (after type conversion):\n%s", self.subnet_metrics_df.head())
         return True
 
     def identify_threats(self,
@@ -413,15 +424,15 @@ class ThreatAnalyzer:
         if 'subnet' not in self.log_df.columns:
             logger.info("Adding 'subnet' column to log_df...")
             try:
-                self.log_df['subnet'] = self.log_df['ip'].map(get_subnet)
+                self.log_df['subnet'] = self.log_df['ip'].map(get_subnet_str)
                 initial_rows = len(self.log_df)
                 self.log_df = self.log_df.dropna(subset=['subnet'])
                 dropped_rows = initial_rows - len(self.log_df)
                 if dropped_rows > 0:
-                     logger.warning(f"Dropped {dropped_rows} rows due to missing subnet information.")
+                     logger.warning("Dropped %s rows due to missing subnet information.", dropped_rows)
                 logger.info("'subnet' column added.")
             except Exception as e:
-                 logger.error(f"Failed to add 'subnet' column: {e}", exc_info=True)
+                 logger.error("Failed to add 'subnet' column: %s", e, exc_info=True)
                  return None # Cannot proceed without subnet
 
         # --- Calculate Metrics ---
@@ -429,27 +440,27 @@ class ThreatAnalyzer:
         if not self._calculate_ip_metrics(analysis_duration_seconds=analysis_duration_seconds):
             logger.error("Failed during IP metrics calculation.")
             return None
-        logger.info(f"IP metrics calculation took {time.time() - start_time:.2f} seconds.")
+        logger.info("IP metrics calculation took %.2f seconds.", time.time() - start_time)
 
         start_time = time.time()
         if not self._aggregate_subnet_metrics(analysis_duration_seconds=analysis_duration_seconds):
             logger.error("Failed during subnet metrics aggregation.")
             return None
-        logger.info(f"Subnet metrics aggregation took {time.time() - start_time:.2f} seconds.")
+        logger.info("Subnet metrics aggregation took %.2f seconds.", time.time() - start_time)
 
         # --- Load Strategy ---
         try:
             strategy_module = importlib.import_module(f"strategies.{strategy_name}")
             strategy_instance = strategy_module.Strategy()
-            logger.info(f"Successfully loaded strategy: {strategy_name}")
+            logger.info("Successfully loaded strategy: %s", strategy_name)
         except ImportError:
-            logger.error(f"Could not load strategy module: strategies.{strategy_name}.py")
+            logger.error("Could not load strategy module: strategies.%s.py", strategy_name)
             return None
         except AttributeError:
-            logger.error(f"Strategy module strategies.{strategy_name}.py does not contain a 'Strategy' class.")
+            logger.error("Strategy module strategies.%s.py does not contain a 'Strategy' class.", strategy_name)
             return None
         except Exception as e:
-             logger.error(f"An unexpected error occurred loading strategy '{strategy_name}': {e}", exc_info=True)
+             logger.error("An unexpected error occurred loading strategy '%s': %s", strategy_name, e, exc_info=True)
              return None
 
         # --- Calculate Maximums from self.subnet_metrics_df for strategy context ---
@@ -480,9 +491,9 @@ class ThreatAnalyzer:
                     else:
                         strategy_context[f'max_{metric_key}'] = default_value
                 else:
-                    logger.warning(f"Metric '{metric_key}' not found in subnet_metrics_df for max calculation. Using default for strategy context.")
+                    logger.warning("Metric '%s' not found in subnet_metrics_df for max calculation. Using default for strategy context.", metric_key)
                     strategy_context[f'max_{metric_key}'] = default_value
-            logger.debug(f"Strategy context enriched with maximums: {strategy_context}")
+            logger.debug("Strategy context enriched with maximums: %s", strategy_context)
         else:
             logger.warning("Subnet metrics DataFrame is empty. Strategies will receive initial shared_context_params without calculated maximums.")
             # Ensure default max keys are present if strategies expect them
@@ -500,24 +511,38 @@ class ThreatAnalyzer:
             logger.debug("Preparing top IP details per subnet...")
             try:
                 # Sort IPs by max_rpm_activity descending, group by subnet, take top 5
-                top_ips_per_subnet = self.ip_metrics_df.sort_values('max_rpm_activity', ascending=False) \
-                                                    .groupby('subnet', observed=True) \
-                                                    .head(5) # Get top 5 rows per group
-
-                # Convert these top IPs into the desired dictionary format per subnet
-                for subnet, group_df in top_ips_per_subnet.groupby('subnet', observed=True):
-                    details_list = []
-                    for ip, ip_metrics in group_df.iterrows():
-                        details_list.append({
-                            'ip': str(ip), # Ensure IP is string
-                            'total_requests': int(ip_metrics.get('total_requests', 0)),
-                            'avg_rpm': round(ip_metrics.get('avg_rpm_activity', 0), 2),
-                            'max_rpm': round(ip_metrics.get('max_rpm_activity', 0), 2),
-                        })
-                    top_ips_details[subnet] = details_list
-                logger.debug(f"Prepared details for {len(top_ips_details)} subnets.")
+                ranked_ips = self.ip_metrics_df.sort_values('max_rpm_activity', ascending=False)
+                # Group on integer subnet codes: a stable sort keeps the max_rpm order inside each
+                # subnet, and single-IP subnets (most of them in sparse logs) cost one code each
+                subnet_codes, subnet_uniques = pd.factorize(ranked_ips['subnet'])
+                by_subnet = np.argsort(subnet_codes, kind='stable')
+                codes_by_subnet = subnet_codes[by_subnet]
+                group_starts = np.flatnonzero(np.r_[True, codes_by_subnet[1:] != codes_by_subnet[:-1]])
+                rank_in_subnet = np.arange(len(by_subnet)) - np.repeat(group_starts, np.diff(np.r_[group_starts, len(by_subnet)]))
+                top_positions = by_subnet[rank_in_subnet < 5]
+                top_ips_per_subnet = ranked_ips.iloc[top_positions] # Top 5 rows per subnet
+
+                # Convert these top IPs into the desired dictionary format per subnet, column-wise
+                # (no per-row Series); rows are already in max_rpm order within each subnet
+                details_lists = [[] for _ in range(len(subnet_uniques))]
+                top_ip_columns = zip(
+                    subnet_codes[top_positions].tolist(),
+                    top_ips_per_subnet.index.astype(str).tolist(), # Ensure IP is string
+                    top_ips_per_subnet['total_requests'].astype(int).tolist(),
+                    top_ips_per_subnet['avg_rpm_activity'].round(2).tolist(),
+                    top_ips_per_subnet['max_rpm_activity'].round(2).tolist(),
+                )
+                for subnet_code, ip, total_requests, avg_rpm, max_rpm in top_ip_columns:
+                    details_lists[subnet_code].append({
+                        'ip': ip,
+                        'total_requests': total_requests,
+                        'avg_rpm': avg_rpm,
+                        'max_rpm': max_rpm,
+                    })
+                top_ips_details = dict(zip(subnet_uniques, details_lists))
+                logger.debug("Prepared details for %s subnets.", len(top_ips_details))
             except Exception as e:
-                logger.error(f"Error preparing top IP details: {e}", exc_info=True)
+                logger.error("Error preparing top IP details: %s", e, exc_info=True)
                 # Continue without details if preparation fails
 
 
@@ -526,97 +551,110 @@ class ThreatAnalyzer:
         if self.subnet_metrics_df is None or self.subnet_metrics_df.empty:
              logger.warning("Subnet metrics DataFrame is empty. Skipping strategy application.")
         else:
-             logger.info(f"Applying '{strategy_name}' strategy to {len(self.subnet_metrics_df)} subnets...")
+             logger.info("Applying '%s' strategy to %s subnets...", strategy_name, len(self.subnet_metrics_df))
              start_time = time.time()
-             for subnet_obj, metrics_row in self.subnet_metrics_df.iterrows():
-                 threat_data = metrics_row.to_dict()
-                 threat_data['id'] = subnet_obj # Ensure subnet_id object is in the dict
-
-                 # Calculate score and block decision using the strategy
-                 score, should_block, reason = strategy_instance.calculate_threat_score_and_block(
-                     threat_data=threat_data,
-                     config=config, # Pass command line args directly
-                     effective_min_requests=effective_min_requests,
-                     shared_context_params=strategy_context # MODIFIED: Pass the enriched context
-                 )
-
-                 # Build the final dictionary for this threat
-                 threat_result = {
-                     'type': 'subnet',
-                     'id': subnet_obj, # Keep as object for now, convert during export
-                     'total_requests': int(threat_data.get('total_requests', 0)),
-                     'ip_count': int(threat_data.get('ip_count', 0)),
-                     'subnet_time_span': round(threat_data.get('subnet_time_span', 0), 2),
-                     'subnet_req_per_min_window': round(threat_data.get('subnet_req_per_min_window', 0), 2),
-                     'subnet_req_per_hour': round(threat_data.get('subnet_req_per_hour', 0), 2), # ADDED: Include subnet_req_per_hour
-                     'details': top_ips_details.get(subnet_obj, []), # Get pre-calculated details
-                     'strategy_score': score, # Use calculated score
-                     'should_block': should_block, # Use calculated decision
-                     'block_reason': reason # Use calculated reason
-                 }
-                 results.append(threat_result)
-             logger.info(f"Strategy application took {time.time() - start_time:.2f} seconds.")
-
-        # --- Sort Results ---
-        results.sort(key=lambda x: x.get('strategy_score', 0), reverse=True)
+             metrics_df = self.subnet_metrics_df
+             # Strategies only see the thresholds they declare, snapshotted once
+             strategy_config = strategy_instance.snapshot_config(config)
+
+             # Specialize the strategy to this run's thresholds, then score all subnets in one vectorized pass
+             scorer = strategy_instance.compile(
+                 config=strategy_config,
+                 effective_min_requests=effective_min_requests,
+                 shared_context_params=strategy_context # MODIFIED: Pass the enriched context
+             )
+             scores, should_block, reasons = scorer(metrics_df)
+
+             # Build the final threat records column-wise in subnet order; ranking is done
+             # on demand by top_threat_positions instead of sorting every threat here
+             threats_frame = pd.DataFrame({
+                 'type': 'subnet',
+                 'id': metrics_df.index, # Keep as object for now, convert during export
+                 'total_requests': metrics_df['total_requests'].astype(int).to_numpy(),
+                 'ip_count': metrics_df['ip_count'].astype(int).to_numpy(),
+                 'subnet_time_span': metrics_df['subnet_time_span'].round(2).to_numpy(),
+                 'subnet_req_per_min_window': metrics_df['subnet_req_per_min_window'].round(2).to_numpy(),
+                 'subnet_req_per_hour': metrics_df['subnet_req_per_hour'].round(2).to_numpy(),
+                 'details': [top_ips_details.get(str(subnet_obj), []) for subnet_obj in metrics_df.index], # Get pre-calculated details (keyed by subnet string)
+                 'strategy_score': scores,
+                 'should_block': should_block,
+                 'block_reason': reasons
+             })
+             self.threats_frame = threats_frame
+             results = threats_frame.to_dict('records')
+             self.threat_scores = np.asarray(scores, dtype=float)
+             logger.info("Strategy application took %.2f seconds.", time.time() - start_time)
 
         # --- Store final list ---
         self.unified_threats = results # Store the results list
 
-        logger.info(f"Threat identification complete. Found {len(self.unified_threats)} subnet threats.")
+        logger.info("Threat identification complete. Found %s subnet threats.", len(self.unified_threats))
         return self.unified_threats
 
+    def top_threat_positions(self, top):
+        """
+        Positions (in unified_threats / get_threats_df rows) of the highest-scoring threats.
+
+        Selects with np.partition in O(N) and sorts only the selected block. Ties on the
+        cut-off score are taken in position order, so the result equals the first `top`
+        entries of a stable descending sort by strategy_score.
+
+        Args:
+            top (int): Number of threats to return.
+
+        Returns:
+            np.ndarray: Integer positions, best score first.
+        """
+        scores = self.threat_scores
+        n = len(scores)
+        top = max(0, min(int(top), n))
+        if top == 0:
+            return np.empty(0, dtype=np.intp)
+        if top < n:
+            cutoff = np.partition(scores, n - top)[n - top] # top-th largest score
+            above_cutoff = np.flatnonzero(scores > cutoff)
+            at_cutoff = np.flatnonzero(scores == cutoff)[:top - len(above_cutoff)]
+            candidates = np.concatenate([above_cutoff, at_cutoff])
+        else:
+            candidates = np.arange(n)
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    def get_top_threats(self, top):
+        """Returns the `top` highest-scoring threat dicts, best first (see top_threat_positions)."""
+        return [self.unified_threats[i] for i in self.top_threat_positions(top)]
+
     def export_results(self, format_type, output_file, config=None, threats=None):
         """
         Exports the identified threats to a specified format.
-        Accepts the primary threats list. Handles data type serialization.
+
+        Serializes a columnar DataFrame with pandas' to_csv/to_json instead of
+        converting every threat dict field by field. JSON is written with orjson
+        when it is installed.
+
+        Args:
+            format_type (str): 'csv', 'json' or 'text'.
+            output_file (str): Destination path.
+            config (argparse.Namespace, optional): Unused, kept for interface compatibility.
+            threats (pd.DataFrame or list, optional): Threats to export, in the desired order.
+                Defaults to all identified threats ranked by strategy score.
+
+        Returns:
+            bool: True if the file was written.
         """
         if threats is None:
-             # Use self.unified_threats if available
-             threats = self.unified_threats
-             if not threats:
+             # Use the columnar threats frame if available, ranked by strategy score
+             if self.threats_frame is None or self.threats_frame.empty:
                  logger.error("No threat data available (checked input and self.unified_threats). Cannot export.")
                  return False
+             df_export = self.threats_frame.iloc[self.top_threat_positions(len(self.threats_frame))]
+        elif isinstance(threats, pd.DataFrame):
+             df_export = threats
+        else:
+             df_export = pd.DataFrame(list(threats))
 
-        logger.info(f"Preparing to export {len(threats)} threats to {output_file} in {format_type} format.")
-
-        # Convert threat data for export (handle ipaddress, datetime, numpy types)
-        export_data = []
-        for threat in threats:
-             # Create a copy to avoid modifying the original dict
-             threat_copy = threat.copy()
-             # Convert specific fields
-             for key, value in threat_copy.items():
-                 if isinstance(value, (ipaddress.IPv4Network, ipaddress.IPv6Network, ipaddress.IPv4Address, ipaddress.IPv6Address)):
-                     threat_copy[key] = str(value)
-                 elif isinstance(value, (datetime, pd.Timestamp)):
-                     # Ensure timezone info is handled correctly if present
-                     if value.tzinfo:
-                         threat_copy[key] = value.isoformat()
-                     else:
-                         # If somehow naive, assume UTC or local? Let's assume UTC for consistency.
-                         threat_copy[key] = value.replace(tzinfo=timezone.utc).isoformat()
-                 elif isinstance(value, (np.integer, np.int64)):
-                     threat_copy[key] = int(value)
-                 elif isinstance(value, (np.floating, np.float64)):
-                     threat_copy[key] = float(value)
-                 elif isinstance(value, np.bool_):
-                      threat_copy[key] = bool(value)
-                 # Ensure details list is serializable (IPs should be strings already, but double-check)
-                 elif key == 'details' and isinstance(value, list):
-                      # Assuming details were already prepared with string IPs
-                      threat_copy[key] = value # Keep as is if already serializable
-                      # If details might contain non-serializable types, add conversion here:
-                      # threat_copy[key] = [
-                      #     {k: str(v) if isinstance(v, ...) else v for k, v in detail.items()}
-                      #     for detail in value
-                      # ]
-
-             export_data.append(threat_copy)
-
+        logger.info("Preparing to export %s threats to %s in %s format.", len(df_export), output_file, format_type)
 
         try:
-            df_export = pd.DataFrame(export_data)
             # Reorder columns for clarity - REMOVED metrics
             cols_order = [
                 'id', 'strategy_score', 'should_block', 'block_reason',
@@ -630,38 +668,67 @@ class ThreatAnalyzer:
             cols_present = [col for col in df_export.columns if col in cols_order]
             # Add any remaining columns not in the desired order list
             remaining_cols = [col for col in df_export.columns if col not in cols_present]
-            df_export = df_export[cols_present + remaining_cols]
-
+            df_export = df_export[cols_present + remaining_cols].reset_index(drop=True)
+            # ipaddress objects are the only non-native column; one vectorized str conversion
+            if 'id' in df_export.columns:
+                df_export['id'] = df_export['id'].astype(str)
 
             if format_type == 'csv':
                 # Handle list in 'details' column for CSV export by converting to JSON string
                 if 'details' in df_export.columns:
-                    df_export['details'] = df_export['details'].apply(lambda x: json.dumps(x) if isinstance(x, list) else x)
+                    df_export['details'] = [json.dumps(x) if isinstance(x, list) else x for x in df_export['details']]
                 df_export.to_csv(output_file, index=False, quoting=csv.QUOTE_NONNUMERIC) # Ensure proper quoting
             elif format_type == 'json':
-                # Use records orientation for a list of JSON objects
-                df_export.to_json(output_file, orient='records', indent=4, date_format='iso') # Ensure ISO date format
+                if orjson is not None:
+                    # Build records column-wise (native Python values) and serialize in one native call;
+                    # NaN (e.g. missing block_reason) is written as null, as with to_json
+                    columns = list(df_export.columns)
+                    column_values = [df_export[col].tolist() for col in columns]
+                    records = [dict(zip(columns, row)) for row in zip(*column_values)]
+                    with open(output_file, 'wb') as f:
+                        f.write(orjson.dumps(records, default=str))
+                else:
+                    # Use records orientation for a list of JSON objects; nested 'details' lists serialize natively.
+                    # Compact, like the orjson path, so the file layout does not depend on optional packages
+                    df_export.to_json(output_file, orient='records', date_format='iso') # Ensure ISO date format
             elif format_type == 'text':
                 # Basic text output, similar to console but to file
                 with open(output_file, 'w') as f:
                     # Use pandas to_string with adjusted width for better readability
                     f.write(df_export.to_string(index=False, max_colwidth=100))
             else:
-                logger.error(f"Unsupported export format: {format_type}")
+                logger.error("Unsupported export format: %s", format_type)
                 return False
             return True
         except Exception as e:
-            logger.error(f"Failed to export results to {output_file}: {e}", exc_info=True)
+            logger.error("Failed to export results to %s: %s", output_file, e, exc_info=True)
             return False
 
     def get_threats_df(self):
-        """Returns the identified threats as a DataFrame, converting ID to string."""
+        """
+        Returns the identified threats as a DataFrame, converting ID to string.
+
+        Metric columns are downcast to the smallest integer/float dtype that holds
+        them and repeated strings ('type', 'block_reason') are stored as categoricals.
+        'strategy_score' is left as float64 so ranking ties are not introduced.
+        Row order matches unified_threats (subnet order); use top_threat_positions to rank.
+        """
         if not self.unified_threats:
             logger.warning("No threats identified or stored in unified_threats list.")
             return pd.DataFrame() # Return empty DataFrame
         try:
             # Convert the list of dictionaries directly to a DataFrame
             df = pd.DataFrame(self.unified_threats)
+            # Shrink per-threat memory: downcast numerics, categorize repeated strings
+            for col in ('total_requests', 'ip_count'):
+                if col in df.columns:
+                    df[col] = pd.to_numeric(df[col], downcast='integer')
+            for col in ('subnet_time_span', 'subnet_req_per_min_window', 'subnet_req_per_hour'):
+                if col in df.columns:
+                    df[col] = pd.to_numeric(df[col], downcast='float')
+            for col in ('type', 'block_reason'):
+                if col in df.columns:
+                    df[col] = df[col].astype('category')
             # Convert the 'id' column (ipaddress objects) to string for consistent indexing/lookup
             if 'id' in df.columns:
                  df['id_str'] = df['id'].astype(str) # Create a string version
@@ -670,5 +737,5 @@ class ThreatAnalyzer:
                  # df = df.drop(columns=['id'])
             return df
         except Exception as e:
-            logger.error(f"Error converting unified_threats list to DataFrame: {e}", exc_info=True)
+            logger.error("Error converting unified_threats list to DataFrame: %s", e, exc_info=True)
             return pd.DataFrame() # Return empty DataFrame on error
\ No newline at end of file
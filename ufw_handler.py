@@ -20,9 +20,18 @@ class UFWManager:
     Handles UFW operations: blocking targets with expiration comments and cleaning expired rules.
     """
 
-    def __init__(self, dry_run=False):
-        """Initializes the UFW handler."""
+    def __init__(self, dry_run=False, block_time_utc=None):
+        """
+        Initializes the UFW handler.
+
+        Args:
+            dry_run (bool): Log commands instead of executing them.
+            block_time_utc (datetime, optional): Aware UTC time block expirations are counted from.
+                                                 Defaults to now; fixed for the lifetime of the handler.
+        """
         self.dry_run = dry_run
+        self.block_time_utc = block_time_utc or datetime.now(timezone.utc)
+        self._expiry_strs = {} # block_duration_minutes -> formatted expiry, computed once per duration
         self._check_ufw_available()
 
     def _check_ufw_available(self):
@@ -79,22 +88,12 @@ class UFWManager:
                 return subprocess.CompletedProcess(args=final_command, returncode=1, stdout="", stderr=str(e))
 
 
-    def block_target(self, subnet_or_ip_obj, block_duration_minutes):
-        """
-        Blocks an IP or subnet using UFW with an ISO 8601 expiration comment.
-        Inserts the rule at position 1 for priority.
-
-        Args:
-            subnet_or_ip_obj (ipaddress.network or ipaddress.address): IP/Subnet object to block.
-            block_duration_minutes (int): Block duration in minutes.
-
-        Returns:
-            bool: True if the command was executed successfully (or in dry run), False otherwise.
-        """
+    def _target_to_cidr(self, subnet_or_ip_obj):
+        """Returns the target as a CIDR string (e.g., 1.2.3.4/32), or None if the type is invalid."""
         valid_types = (ipaddress.IPv4Network, ipaddress.IPv6Network, ipaddress.IPv4Address, ipaddress.IPv6Address)
         if not isinstance(subnet_or_ip_obj, valid_types):
             logger.error(f"Invalid data type for blocking: {type(subnet_or_ip_obj)}")
-            return False
+            return None
 
         # Ensure target is in CIDR format (e.g., 1.2.3.4/32)
         target_str = str(subnet_or_ip_obj.exploded) # Use exploded for consistency
@@ -103,14 +102,39 @@ class UFWManager:
             target_str = f"{target_str}/{prefix_len}"
         elif isinstance(subnet_or_ip_obj, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
              target_str = str(subnet_or_ip_obj) # Already in CIDR
-
-        # Calculate expiration timestamp and format comment
-        expiry_time_utc = datetime.now(timezone.utc) + timedelta(minutes=block_duration_minutes)
-        expiry_str_iso = expiry_time_utc.strftime('%Y%m%dT%H%M%SZ')
+        return target_str
+
+    def _build_block_args(self, target_str, block_duration_minutes):
+        """Returns (ufw insert args, expiry ISO string) for blocking target_str."""
+        # Expiration timestamp is shared by every block of the same duration in this run
+        expiry_str_iso = self._expiry_strs.get(block_duration_minutes)
+        if expiry_str_iso is None:
+            expiry_time_utc = self.block_time_utc + timedelta(minutes=block_duration_minutes)
+            expiry_str_iso = expiry_time_utc.strftime('%Y%m%dT%H%M%SZ')
+            self._expiry_strs[block_duration_minutes] = expiry_str_iso
         comment = f"{COMMENT_PREFIX}{expiry_str_iso}"
 
         # Construct command to insert rule at position 1
         command_args = ["insert", "1", "deny", "from", target_str, "to", "any", "comment", comment]
+        return command_args, expiry_str_iso
+
+    def block_target(self, subnet_or_ip_obj, block_duration_minutes):
+        """
+        Blocks an IP or subnet using UFW with an ISO 8601 expiration comment.
+        Inserts the rule at position 1 for priority.
+
+        Args:
+            subnet_or_ip_obj (ipaddress.network or ipaddress.address): IP/Subnet object to block.
+            block_duration_minutes (int): Block duration in minutes.
+
+        Returns:
+            bool: True if the command was executed successfully (or in dry run), False otherwise.
+        """
+        target_str = self._target_to_cidr(subnet_or_ip_obj)
+        if target_str is None:
+            return False
+
+        command_args, expiry_str_iso = self._build_block_args(target_str, block_duration_minutes)
 
         logger.info(f"Attempting to block: {target_str} until {expiry_str_iso} UTC")
         result = self._run_ufw_command(command_args)
@@ -124,6 +148,19 @@ class UFWManager:
         else:
              return False
 
+    def block_targets(self, targets):
+        """
+        Blocks several IPs/subnets in order, one block_target call each.
+
+        Args:
+            targets (list): (subnet_or_ip_obj, block_duration_minutes) tuples, in insertion order.
+
+        Returns:
+            list: One bool per target (same order): True if blocked (or in dry run), False otherwise.
+        """
+        return [self.block_target(subnet_or_ip_obj, block_duration_minutes)
+                for subnet_or_ip_obj, block_duration_minutes in targets]
+
 
     def clean_expired_rules(self):
         """